@@ -36,6 +36,7 @@ CREATE TABLE IF NOT EXISTS race_event (
   general_access_status TEXT DEFAULT 'unknown',
   status_confidence NUMERIC DEFAULT 0.5,
   status_source TEXT,
+  reg_opens_at TIMESTAMPTZ,
   last_checked_at TIMESTAMPTZ,
   created_at TIMESTAMPTZ DEFAULT NOW(),
   updated_at TIMESTAMPTZ DEFAULT NOW(),
@@ -53,6 +54,10 @@ COMMENT ON COLUMN race_event.general_access_status IS 'Current registration stat
 COMMENT ON COLUMN race_event.status_confidence IS 'Confidence score 0-1 for the parsed status';
 COMMENT ON COLUMN race_event.status_source IS 'Source of status info (e.g., "official_site", "manual")';
 
+-- Added after the first release; safe to re-run on existing databases.
+ALTER TABLE race_event ADD COLUMN IF NOT EXISTS reg_opens_at TIMESTAMPTZ;
+COMMENT ON COLUMN race_event.reg_opens_at IS 'Expected registration opening (seed dates are imported as local midnight in event_timezone); puts not_yet_open races in the watch hot set';
+
 -- ============================================================================
 -- Table: status_observation
 -- Raw observations from web scraping and other sources
@@ -66,15 +71,60 @@ CREATE TABLE IF NOT EXISTS status_observation (
   confidence NUMERIC,
   url TEXT,
   observed_at TIMESTAMPTZ DEFAULT NOW(),
+  first_seen TIMESTAMPTZ DEFAULT NOW(),
+  last_seen TIMESTAMPTZ DEFAULT NOW(),
+  count INTEGER NOT NULL DEFAULT 1,
+  classifier_version TEXT,
   CONSTRAINT valid_obs_confidence CHECK (
     confidence IS NULL OR (confidence >= 0 AND confidence <= 1)
-  )
+  ),
+  CONSTRAINT valid_obs_count CHECK (count >= 1)
 );
 
+-- Run-length columns (added after the first release; safe to re-run on existing databases).
+-- Existing rows are backfilled from observed_at before the NOW() defaults are applied.
+ALTER TABLE status_observation ADD COLUMN IF NOT EXISTS first_seen TIMESTAMPTZ;
+ALTER TABLE status_observation ADD COLUMN IF NOT EXISTS last_seen TIMESTAMPTZ;
+ALTER TABLE status_observation ADD COLUMN IF NOT EXISTS count INTEGER NOT NULL DEFAULT 1;
+UPDATE status_observation SET first_seen = observed_at WHERE first_seen IS NULL;
+UPDATE status_observation SET last_seen = observed_at WHERE last_seen IS NULL;
+ALTER TABLE status_observation ALTER COLUMN first_seen SET DEFAULT NOW();
+ALTER TABLE status_observation ALTER COLUMN last_seen SET DEFAULT NOW();
+ALTER TABLE status_observation ADD COLUMN IF NOT EXISTS classifier_version TEXT;
+
 COMMENT ON TABLE status_observation IS 'Historical log of all status checks and their results';
 COMMENT ON COLUMN status_observation.source IS 'Observation source (e.g., "official_site", "social_media")';
 COMMENT ON COLUMN status_observation.raw_excerpt IS 'Text snippet that informed the classification';
 COMMENT ON COLUMN status_observation.parsed_status IS 'Interpreted status from the excerpt';
+COMMENT ON COLUMN status_observation.first_seen IS 'First check in this run of identical observations';
+COMMENT ON COLUMN status_observation.last_seen IS 'Most recent check in this run of identical observations';
+COMMENT ON COLUMN status_observation.count IS 'Number of consecutive identical checks collapsed into this row';
+COMMENT ON COLUMN status_observation.classifier_version IS 'Version tag of the classifier that produced parsed_status/confidence';
+
+-- ============================================================================
+-- Table: status_change
+-- Append-only feed of race_event status transitions written by the resolver.
+-- change_id is a monotonic cursor: consumers read "changes since change_id X".
+-- Concurrent writers can commit ids out of order, so readers skip rows newer
+-- than a settle time (see scripts/changes.py).
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS status_change (
+  change_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  event_id UUID NOT NULL REFERENCES race_event(event_id) ON DELETE CASCADE,
+  old_status TEXT,
+  new_status TEXT NOT NULL,
+  confidence NUMERIC,
+  changed_at TIMESTAMPTZ DEFAULT NOW(),
+  CONSTRAINT valid_change_status CHECK (
+    new_status IN ('unknown', 'not_yet_open', 'open', 'waitlist', 'sold_out', 'closed')
+  ),
+  CONSTRAINT valid_change_confidence CHECK (
+    confidence IS NULL OR (confidence >= 0 AND confidence <= 1)
+  )
+);
+
+COMMENT ON TABLE status_change IS 'Status transitions of race events, for consumers that only want what changed';
+COMMENT ON COLUMN status_change.change_id IS 'Monotonic cursor for "changes since" reads';
 
 -- ============================================================================
 -- Indexes for performance
@@ -84,6 +134,8 @@ CREATE INDEX IF NOT EXISTS idx_event_date ON race_event(event_local_date);
 CREATE INDEX IF NOT EXISTS idx_event_series ON race_event(series_id);
 CREATE INDEX IF NOT EXISTS idx_obs_event_time ON status_observation(event_id, observed_at DESC);
 CREATE INDEX IF NOT EXISTS idx_obs_time ON status_observation(observed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_obs_event_last_seen ON status_observation(event_id, last_seen DESC);
+CREATE INDEX IF NOT EXISTS idx_change_event ON status_change(event_id, change_id DESC);
 
 -- ============================================================================
 -- Views for common queries
@@ -100,13 +152,59 @@ SELECT
   re.event_local_date,
   re.reg_url,
   re.status_confidence,
-  re.last_checked_at
+  re.last_checked_at,
+  re.event_id
 FROM race_event re
 JOIN race_series rs ON re.series_id = rs.series_id
 WHERE re.general_access_status = 'open'
   AND (re.event_local_date IS NULL OR re.event_local_date >= CURRENT_DATE)
 ORDER BY re.event_local_date NULLS LAST;
 
+-- View: Most recent observation run per event (used by the crawler and resolver)
+CREATE OR REPLACE VIEW latest_observation AS
+SELECT DISTINCT ON (event_id)
+  observation_id,
+  event_id,
+  source,
+  parsed_status,
+  confidence,
+  url,
+  observed_at,
+  first_seen,
+  last_seen,
+  count
+FROM status_observation
+ORDER BY event_id, COALESCE(last_seen, observed_at) DESC;
+
+-- View: Most recent status change per event (the status the resolver last published)
+CREATE OR REPLACE VIEW latest_status_change AS
+SELECT DISTINCT ON (event_id)
+  change_id,
+  event_id,
+  old_status,
+  new_status,
+  confidence,
+  changed_at
+FROM status_change
+ORDER BY event_id, change_id DESC;
+
+-- View: Events whose observations are not yet in run-length form (used by compaction):
+-- rows missing first_seen/last_seen, or a row repeating the previous row's run
+CREATE OR REPLACE VIEW compaction_candidate AS
+SELECT DISTINCT event_id
+FROM (
+  SELECT
+    event_id,
+    first_seen,
+    last_seen,
+    source IS NOT DISTINCT FROM LAG(source) OVER w
+      AND url IS NOT DISTINCT FROM LAG(url) OVER w
+      AND COALESCE(parsed_status, 'unknown') = LAG(COALESCE(parsed_status, 'unknown')) OVER w AS repeats_previous
+  FROM status_observation
+  WINDOW w AS (PARTITION BY event_id ORDER BY COALESCE(first_seen, observed_at), observation_id)
+) o
+WHERE first_seen IS NULL OR last_seen IS NULL OR repeats_previous;
+
 -- View: Recently sold out races (helpful for waitlist alerts)
 CREATE OR REPLACE VIEW recently_sold_out AS
 SELECT
@@ -116,7 +214,8 @@ SELECT
   re.event_local_date,
   re.reg_url,
   re.last_checked_at,
-  re.status_confidence
+  re.status_confidence,
+  re.event_id
 FROM race_event re
 JOIN race_series rs ON re.series_id = rs.series_id
 WHERE re.general_access_status = 'sold_out'
@@ -0,0 +1,205 @@
+-- RaceRadar Database Schema (SQLite)
+-- Local mirror of schema.sql used by the SQLite storage backend (scripts/storage.py).
+-- Keep in sync with schema.sql: same tables, constraints, indexes and views.
+-- UUIDs and timestamps are stored as TEXT (ISO 8601, UTC).
+
+-- ============================================================================
+-- Table: race_series
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS race_series (
+  series_id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  city TEXT,
+  country TEXT,
+  distance_km NUMERIC,
+  official_url TEXT,
+  timezone TEXT,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+
+-- ============================================================================
+-- Table: race_event
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS race_event (
+  event_id TEXT PRIMARY KEY DEFAULT (
+    lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' ||
+    substr(lower(hex(randomblob(2))), 2) || '-' ||
+    substr('89ab', 1 + (abs(random()) % 4), 1) || substr(lower(hex(randomblob(2))), 2) || '-' ||
+    lower(hex(randomblob(6)))
+  ),
+  series_id TEXT NOT NULL REFERENCES race_series(series_id) ON DELETE CASCADE,
+  year INTEGER NOT NULL,
+  event_local_date TEXT,
+  event_timezone TEXT,
+  reg_url TEXT,
+  general_access_status TEXT DEFAULT 'unknown',
+  status_confidence NUMERIC DEFAULT 0.5,
+  status_source TEXT,
+  reg_opens_at TEXT,
+  last_checked_at TEXT,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  UNIQUE(series_id, year),
+  CONSTRAINT valid_status CHECK (
+    general_access_status IN ('unknown', 'not_yet_open', 'open', 'waitlist', 'sold_out', 'closed')
+  ),
+  CONSTRAINT valid_confidence CHECK (
+    status_confidence >= 0 AND status_confidence <= 1
+  )
+);
+
+-- ============================================================================
+-- Table: status_observation
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS status_observation (
+  observation_id TEXT PRIMARY KEY DEFAULT (
+    lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' ||
+    substr(lower(hex(randomblob(2))), 2) || '-' ||
+    substr('89ab', 1 + (abs(random()) % 4), 1) || substr(lower(hex(randomblob(2))), 2) || '-' ||
+    lower(hex(randomblob(6)))
+  ),
+  event_id TEXT NOT NULL REFERENCES race_event(event_id) ON DELETE CASCADE,
+  source TEXT NOT NULL,
+  raw_excerpt TEXT,
+  parsed_status TEXT,
+  confidence NUMERIC,
+  url TEXT,
+  observed_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  first_seen TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  last_seen TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  count INTEGER NOT NULL DEFAULT 1,
+  classifier_version TEXT,
+  CONSTRAINT valid_obs_confidence CHECK (
+    confidence IS NULL OR (confidence >= 0 AND confidence <= 1)
+  ),
+  CONSTRAINT valid_obs_count CHECK (count >= 1)
+);
+
+-- ============================================================================
+-- Table: status_change
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS status_change (
+  change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  event_id TEXT NOT NULL REFERENCES race_event(event_id) ON DELETE CASCADE,
+  old_status TEXT,
+  new_status TEXT NOT NULL,
+  confidence NUMERIC,
+  changed_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  CONSTRAINT valid_change_status CHECK (
+    new_status IN ('unknown', 'not_yet_open', 'open', 'waitlist', 'sold_out', 'closed')
+  ),
+  CONSTRAINT valid_change_confidence CHECK (
+    confidence IS NULL OR (confidence >= 0 AND confidence <= 1)
+  )
+);
+
+-- ============================================================================
+-- Indexes for performance
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_event_status ON race_event(general_access_status);
+CREATE INDEX IF NOT EXISTS idx_event_date ON race_event(event_local_date);
+CREATE INDEX IF NOT EXISTS idx_event_series ON race_event(series_id);
+CREATE INDEX IF NOT EXISTS idx_obs_event_time ON status_observation(event_id, observed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_obs_time ON status_observation(observed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_obs_event_last_seen ON status_observation(event_id, last_seen DESC);
+CREATE INDEX IF NOT EXISTS idx_change_event ON status_change(event_id, change_id DESC);
+
+-- ============================================================================
+-- Views for common queries
+-- ============================================================================
+
+-- View: Upcoming races with open registration
+DROP VIEW IF EXISTS open_races;  -- recreated so column changes reach existing databases
+CREATE VIEW open_races AS
+SELECT
+  rs.name,
+  rs.city,
+  rs.country,
+  rs.distance_km,
+  re.year,
+  re.event_local_date,
+  re.reg_url,
+  re.status_confidence,
+  re.last_checked_at,
+  re.event_id
+FROM race_event re
+JOIN race_series rs ON re.series_id = rs.series_id
+WHERE re.general_access_status = 'open'
+  AND (re.event_local_date IS NULL OR re.event_local_date >= CURRENT_DATE)
+ORDER BY re.event_local_date NULLS LAST;
+
+-- View: Most recent observation run per event (used by the crawler and resolver)
+CREATE VIEW IF NOT EXISTS latest_observation AS
+SELECT
+  observation_id,
+  event_id,
+  source,
+  parsed_status,
+  confidence,
+  url,
+  observed_at,
+  first_seen,
+  last_seen,
+  count
+FROM (
+  SELECT
+    so.*,
+    ROW_NUMBER() OVER (
+      PARTITION BY event_id ORDER BY COALESCE(last_seen, observed_at) DESC
+    ) AS rn
+  FROM status_observation so
+)
+WHERE rn = 1;
+
+-- View: Most recent status change per event (the status the resolver last published)
+CREATE VIEW IF NOT EXISTS latest_status_change AS
+SELECT
+  change_id,
+  event_id,
+  old_status,
+  new_status,
+  confidence,
+  changed_at
+FROM (
+  SELECT
+    sc.*,
+    ROW_NUMBER() OVER (PARTITION BY event_id ORDER BY change_id DESC) AS rn
+  FROM status_change sc
+)
+WHERE rn = 1;
+
+-- View: Events whose observations are not yet in run-length form (used by compaction):
+-- rows missing first_seen/last_seen, or a row repeating the previous row's run
+CREATE VIEW IF NOT EXISTS compaction_candidate AS
+SELECT DISTINCT event_id
+FROM (
+  SELECT
+    event_id,
+    first_seen,
+    last_seen,
+    source IS LAG(source) OVER w
+      AND url IS LAG(url) OVER w
+      AND COALESCE(parsed_status, 'unknown') = LAG(COALESCE(parsed_status, 'unknown')) OVER w AS repeats_previous
+  FROM status_observation
+  WINDOW w AS (PARTITION BY event_id ORDER BY COALESCE(first_seen, observed_at), observation_id)
+)
+WHERE first_seen IS NULL OR last_seen IS NULL OR repeats_previous;
+
+-- View: Recently sold out races (helpful for waitlist alerts)
+DROP VIEW IF EXISTS recently_sold_out;  -- recreated so column changes reach existing databases
+CREATE VIEW recently_sold_out AS
+SELECT
+  rs.name,
+  rs.city,
+  rs.country,
+  re.event_local_date,
+  re.reg_url,
+  re.last_checked_at,
+  re.status_confidence,
+  re.event_id
+FROM race_event re
+JOIN race_series rs ON re.series_id = rs.series_id
+WHERE re.general_access_status = 'sold_out'
+  AND re.last_checked_at >= strftime('%Y-%m-%dT%H:%M:%S', 'now', '-7 days')
+ORDER BY re.last_checked_at DESC;
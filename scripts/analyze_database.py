@@ -3,24 +3,17 @@
 Analyze the current state of the RaceRadar database.
 Shows what data we have, quality metrics, and gaps.
 """
-import os
-import requests
 from collections import Counter
 from datetime import datetime
+from storage import get_backend
+from profiling import profiled_main
 
-SB_URL = os.environ["SUPABASE_URL"].rstrip("/")
-SB_KEY = os.environ["SUPABASE_SERVICE_KEY"]
-HDRS = {
-    "apikey": SB_KEY,
-    "Authorization": f"Bearer {SB_KEY}",
-    "Content-Type": "application/json",
-}
+# Primary key per table, to page through it in a stable order
+TABLE_KEYS = {"race_series": "series_id", "race_event": "event_id", "status_observation": "observation_id"}
 
-def get_data(table, select="*", filters=""):
-    url = f"{SB_URL}/rest/v1/{table}?select={select}{filters}"
-    r = requests.get(url, headers=HDRS, timeout=60)
-    r.raise_for_status()
-    return r.json()
+def get_data(table, select="*", filters=None):
+    params = {"select": select, "order": TABLE_KEYS[table], **(filters or {})}
+    return [row for page in get_backend().select_pages(table, params) for row in page]
 
 def analyze():
     print("=" * 80)
@@ -132,15 +125,18 @@ def analyze():
     print("📝 STATUS OBSERVATIONS")
     print("-" * 80)
     obs = get_data("status_observation")
-    print(f"Total observations: {len(obs)}")
+    # Each row is a run of identical checks (see compact_observations.py)
+    checks = sum(o.get('count') or 1 for o in obs)
+    print(f"Total observation runs: {len(obs)}")
+    print(f"Total checks: {checks}")
 
     if obs:
         # Observations by event
         events_observed = len(set(o.get('event_id') for o in obs))
-        avg_obs_per_event = len(obs) / events_observed if events_observed > 0 else 0
+        avg_obs_per_event = checks / events_observed if events_observed > 0 else 0
         print(f"\n📊 Observation coverage:")
         print(f"     • Events with observations: {events_observed}")
-        print(f"     • Avg observations per event: {avg_obs_per_event:.1f}")
+        print(f"     • Avg checks per event: {avg_obs_per_event:.1f}")
 
         # Status distribution
         obs_statuses = Counter(o.get('parsed_status') for o in obs)
@@ -164,11 +160,11 @@ def analyze():
             print(f"     • {source}: {count} observations")
 
         # Recency
-        most_recent_obs = max(obs, key=lambda o: o.get('observed_at', ''))
-        oldest_obs = min(obs, key=lambda o: o.get('observed_at', ''))
+        first_seen = [o.get('first_seen') or o.get('observed_at') or '' for o in obs]
+        last_seen = [o.get('last_seen') or o.get('observed_at') or '' for o in obs]
         print(f"\n⏰ Observation timeline:")
-        print(f"     • Oldest: {oldest_obs.get('observed_at', 'N/A')[:19]}")
-        print(f"     • Newest: {most_recent_obs.get('observed_at', 'N/A')[:19]}")
+        print(f"     • Oldest: {min(first_seen)[:19] or 'N/A'}")
+        print(f"     • Newest: {max(last_seen)[:19] or 'N/A'}")
 
     print()
 
@@ -247,4 +243,4 @@ def analyze():
     print("=" * 80)
 
 if __name__ == "__main__":
-    analyze()
+    profiled_main(analyze)
@@ -0,0 +1,182 @@
+# scripts/bench_memory.py
+"""
+Memory benchmark for the per-event state of a crawl (default 100k events).
+
+Builds the records check_availability and resolve_latest keep for a whole run
+(the event roster, the latest observation run per event, the resolver's
+latest and current statuses, and the checkpoint's processed set) from
+synthetic PostgREST response pages, once as the JSON-decoded dicts the
+scripts used to hold and once as roster.py's compact records, and reports
+retained and peak memory (tracemalloc) per structure. With --rss, each model
+is also built in a child process and the RSS it adds is reported.
+
+    python scripts/bench_memory.py --events 100000
+    python scripts/bench_memory.py --events 100000 --rss
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tracemalloc
+import uuid
+from config import TIMEZONE_MAP
+from profiling import profiled_main
+from roster import (
+    STATUSES, events_from_pages, latest_runs_from_pages, latest_statuses_from_pages, current_statuses_from_pages,
+    uuid_bytes,
+)
+
+PAGE_SIZE = 1000
+MODELS = ["dict", "compact"]
+
+
+def synthetic_pages(n_events: int, seed: int = 0) -> dict:
+    """
+    Encoded response pages of each query, keyed by structure name.
+
+    Rows are generated and encoded a page at a time, so only the response
+    bodies stay in memory.
+    """
+    rng = random.Random(seed)
+    zones = sorted(set(TIMEZONE_MAP.values()))
+    encoded = {"roster": [], "latest_runs": [], "latest_statuses": [], "current_statuses": []}
+    for start in range(0, n_events, PAGE_SIZE):
+        rows = page_rows(rng, zones, start, min(start + PAGE_SIZE, n_events))
+        for name, page in rows.items():
+            encoded[name].append(json.dumps(page).encode("utf-8"))
+    return encoded
+
+
+def page_rows(rng: random.Random, zones: list, start: int, stop: int) -> dict:
+    events, runs, statuses, current = [], [], [], []
+    for i in range(start, stop):
+        event_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        series = f"race-{i // 3:06d}-marathon"
+        url = f"https://www.{series}.example.com/en/registration?year=2026"
+        status = rng.choice(STATUSES[:5])
+        conf = round(rng.uniform(0.4, 0.99), 2)
+        events.append({"event_id": event_id, "series_id": series, "year": 2024 + i % 3,
+                       "reg_url": url, "event_timezone": rng.choice(zones)})
+        runs.append({"observation_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)), "event_id": event_id,
+                     "source": "official_site", "parsed_status": status, "confidence": conf, "url": url,
+                     "count": rng.randint(1, 400)})
+        statuses.append({"event_id": event_id, "parsed_status": status, "confidence": conf,
+                         "last_seen": "2026-10-19T02:14:07.123456+00:00"})
+        current.append({"event_id": event_id, "general_access_status": rng.choice(STATUSES[:5])})
+    return {"roster": events, "latest_runs": runs, "latest_statuses": statuses, "current_statuses": current}
+
+
+def decoded(pages: list):
+    for body in pages:
+        yield json.loads(body)
+
+
+def dict_latest_statuses(pages):
+    latest = {}
+    for page in pages:
+        for row in page:
+            if row["event_id"] not in latest:
+                latest[row["event_id"]] = {"status": row.get("parsed_status") or "unknown",
+                                           "conf": row.get("confidence", 0.5)}
+    return latest
+
+
+# structure -> {model: builder(decoded pages)}; "dict" is what the scripts held before roster.py
+BUILDERS = {
+    "roster": {
+        "dict": lambda pages: [row for page in pages for row in page],
+        "compact": events_from_pages,
+    },
+    "latest_runs": {
+        "dict": lambda pages: {row["event_id"]: row for page in pages for row in page},
+        "compact": latest_runs_from_pages,
+    },
+    "latest_statuses": {
+        "dict": dict_latest_statuses,
+        "compact": latest_statuses_from_pages,
+    },
+    "current_statuses": {
+        "dict": lambda pages: {row["event_id"]: row.get("general_access_status") for page in pages for row in page},
+        "compact": current_statuses_from_pages,
+    },
+    "processed": {
+        "dict": lambda pages: {row["event_id"] for page in pages for row in page},
+        "compact": lambda pages: {uuid_bytes(row["event_id"]) for page in pages for row in page},
+    },
+}
+SOURCES = {"processed": "roster"}  # structures built from another structure's rows
+
+
+def measure(builder, pages: list) -> tuple:
+    """(retained, peak) bytes allocated while building from `pages`."""
+    tracemalloc.start()
+    result = builder(decoded(pages))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def build_all(model: str, encoded: dict) -> list:
+    """Build every structure with `model` and keep them, as one worker would."""
+    return [BUILDERS[name][model](decoded(encoded[SOURCES.get(name, name)])) for name in BUILDERS]
+
+
+def rss_mib() -> float:
+    """Current RSS of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def rss_of(model: str, n_events: int) -> dict:
+    """RSS (MiB) of a fresh process before and after building every structure with `model`."""
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--events", str(n_events), "--child", model],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict and compact per-event records at scale.")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--rss", action="store_true", help="also measure RSS per model in a child process")
+    parser.add_argument("--child", choices=MODELS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    encoded = synthetic_pages(args.events)
+    if args.child:
+        baseline = rss_mib()
+        held = build_all(args.child, encoded)
+        print(json.dumps({"baseline": baseline, "rss": rss_mib(), "structures": len(held)}))
+        return
+
+    mib = 1024 * 1024
+    print(f"Per-event state for {args.events} events (retained / peak while building, MiB)\n")
+    print(f"{'structure':<18}{'dict':>16}{'compact':>16}{'bytes/event':>18}{'saving':>9}")
+    totals = {m: 0 for m in MODELS}
+    for name, builders in BUILDERS.items():
+        pages = encoded[SOURCES.get(name, name)]
+        results = {m: measure(builders[m], pages) for m in MODELS}
+        for m in MODELS:
+            totals[m] += results[m][0]
+        (d, dp), (c, cp) = results["dict"], results["compact"]
+        print(f"{name:<18}{d / mib:>8.1f} /{dp / mib:>6.1f}{c / mib:>8.1f} /{cp / mib:>6.1f}"
+              f"{d / args.events:>9.0f} ->{c / args.events:>5.0f}{1 - c / d:>9.0%}")
+    d, c = totals["dict"], totals["compact"]
+    print(f"{'total':<18}{d / mib:>8.1f}{'':>8}{c / mib:>8.1f}{'':>8}{d / args.events:>9.0f} ->"
+          f"{c / args.events:>5.0f}{1 - c / d:>9.0%}")
+
+    if args.rss:
+        print("\nRSS of a worker holding every structure (growth over the synthetic response bodies):")
+        for m in MODELS:
+            rss = rss_of(m, args.events)
+            print(f"  {m:<8} {rss['rss']:>8.1f} MiB  (+{rss['rss'] - rss['baseline']:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    profiled_main(main)
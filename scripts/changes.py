@@ -0,0 +1,93 @@
+# scripts/changes.py
+"""
+Status-transition delta feed.
+
+The resolver records every race_event status change in `status_change`.
+Consumers (notifier, website) keep the last change_id they processed and ask
+only for what changed since then instead of re-reading whole views:
+
+    python scripts/changes.py --since 1234
+
+The resolver and the watch daemon both write here, and a change_id can commit
+after a higher one. Reads therefore stop at changes older than
+database.CHANGE_SETTLE_SECONDS, by which time every lower id has committed, so
+a cursor never moves past a row that is still in flight.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from config import database
+from storage import get_backend
+from profiling import profiled_main
+
+CHANGE_COLUMNS = "change_id,event_id,old_status,new_status,confidence,changed_at"
+
+
+def record_changes(changes: list) -> int:
+    """
+    Bulk-insert status transitions.
+
+    Args:
+        changes: dicts with event_id, old_status, new_status, confidence
+
+    Returns:
+        number of changes written
+    """
+    if not changes:
+        return 0
+    db = get_backend()
+    for i in range(0, len(changes), database.BATCH_SIZE):
+        # Stamped per batch, just before its insert, so changed_at stays within one
+        # request of when the rows get their change_ids (see CHANGE_SETTLE_SECONDS)
+        changed_at = datetime.now(timezone.utc).isoformat()
+        rows = [{**c, "changed_at": changed_at} for c in changes[i:i + database.BATCH_SIZE]]
+        db.insert("status_change", rows, returning=False)
+    return len(changes)
+
+
+def settled_before() -> datetime:
+    """Changes stamped before this time are safe to hand to consumers."""
+    return datetime.now(timezone.utc) - timedelta(seconds=database.CHANGE_SETTLE_SECONDS)
+
+
+def get_changes_since(cursor: int = 0, limit: int = 1000) -> tuple:
+    """
+    Read status transitions after a cursor.
+
+    Changes younger than database.CHANGE_SETTLE_SECONDS are left for a later
+    read, since a lower change_id may still be uncommitted.
+
+    Args:
+        cursor: last change_id the consumer has processed (0 = from the start)
+        limit: maximum changes to return
+
+    Returns:
+        (changes, next_cursor): changes in order, and the cursor to pass next time
+    """
+    rows = get_backend().select("status_change", {
+        "select": CHANGE_COLUMNS,
+        "change_id": f"gt.{int(cursor)}",
+        "changed_at": f"lt.{settled_before().isoformat()}",
+        "order": "change_id.asc",
+        "limit": limit,
+    })
+    next_cursor = rows[-1]["change_id"] if rows else cursor
+    return rows, next_cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print status changes after a cursor as JSON lines.")
+    parser.add_argument("--since", type=int, default=0, help="last change_id already processed")
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    changes, next_cursor = get_changes_since(args.since, args.limit)
+    for change in changes:
+        print(json.dumps(change))
+    # Summary on stderr so stdout stays pure JSON lines
+    print(f"{len(changes)} changes since {args.since}; next cursor: {next_cursor}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -1,37 +1,33 @@
 # scripts/check_availability.py
-import os
+import argparse
 import re
-import time
-import requests
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from bs4 import BeautifulSoup
+from config import classification as classification_config, checkpoint as checkpoint_config, database, retention, scraping
 from logger import setup_logger
+from storage import get_backend, StorageError
+from compact_observations import run_key
+from snapshots import get_snapshot_store
+from checkpoint import Checkpoint
+from extract import extract_regions, CONTENT_END_RE
+from fetch import fetch_html, FetchError, Throttled
+from crawl_policy import PolicyCache, HostScheduler
+from roster import LatestRun, events_from_pages, latest_runs_from_pages, uuid_str
+from feature_classifier import load_model, page_features, language_for
+from profiling import profiled_main, EventSampler
 
 logger = setup_logger(__name__)
 
-# ---- Supabase config ----
-try:
-    SB_URL = os.environ["SUPABASE_URL"].rstrip("/")
-    SB_KEY = os.environ["SUPABASE_SERVICE_KEY"]
-    logger.info("Supabase configuration loaded")
-except KeyError as e:
-    logger.error(f"Missing environment variable: {e}")
-    raise SystemExit(f"Missing env var: {e}. Did you export SUPABASE_URL and SUPABASE_SERVICE_KEY?")
-
-HDRS = {
-    "apikey": SB_KEY,
-    "Authorization": f"Bearer {SB_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "return=representation"
+EVENTS_QUERY = {
+    "select": "event_id,series_id,year,reg_url,event_timezone",
+    "general_access_status": "in.(unknown,not_yet_open,open)",
+    "reg_url": "not.is.null",
 }
 
-GET_EVENTS = (
-    f"{SB_URL}/rest/v1/race_event"
-    "?select=event_id,series_id,year,reg_url"
-    "&general_access_status=in.(unknown,not_yet_open,open)"
-    "&reg_url=not.is.null"
-)
-
-POST_OBS = f"{SB_URL}/rest/v1/status_observation"
+# Bump whenever KEYS or classify() change, so observations record which rules produced them
+CLASSIFIER_VERSION = "rules-4"
 
 KEYS = {
     "open":   [r"enter now", r"register", r"sign up", r"inscr", r"iscriv", r"inscript", r"anmelden"],
@@ -40,8 +36,35 @@ KEYS = {
     "notyet": [r"opens", r"opening", r"goes on sale", r"abre"],
 }
 
+# Any registration keyword, used to locate decision regions on a page
+KEYWORD_RE = re.compile("|".join(p for patterns in KEYS.values() for p in patterns))
+
+# One regex per keyword category, used for classifier features
+CATEGORY_RE = {cat: re.compile("|".join(patterns)) for cat, patterns in KEYS.items()}
+
 UA = {"User-Agent": "Mozilla/5.0 (RaceRadarBot/0.1)"}
 
+# Query params that only track the visitor and never change the page
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "ref", "source"}
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL used to coalesce fetches of the same page.
+
+    Ignores scheme (http/https), host case, default ports, trailing slashes,
+    fragments, tracking params (utm_*, gclid, ...) and query param order.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
 def classify(text: str):
     t = text.lower()
     def m(keys): return any(re.search(p, t) for p in keys)
@@ -52,50 +75,268 @@ def classify(text: str):
     if m(KEYS["open"]):   return "open", 0.80
     return "unknown", 0.40
 
-def post_obs(event_id: str, url: str, status: str, conf: float, excerpt: str):
-    r = requests.post(
-        POST_OBS, headers=HDRS, json={
-            "event_id": event_id,
-            "source": "official_site",
-            "raw_excerpt": excerpt[:500],
-            "parsed_status": status,
-            "confidence": conf,
-            "url": url,
-        },
-        timeout=45
-    )
-    if r.status_code >= 300:
-        logger.error(f"Failed to post observation for {event_id}: {r.status_code} {r.text}")
+def page_regions(soup: BeautifulSoup):
+    """
+    Split a parsed page into the regions the classifiers look at.
+
+    Returns:
+        (ctas, windows, body_text); see extract.extract_regions
+    """
+    return extract_regions(soup, KEYWORD_RE)
+
+def classify_regions(ctas: list, windows: list, body_text: str):
+    """
+    Rule-based classification from page regions, falling back to body text.
+
+    CTA buttons/links/headings and the text windows around keyword hits are
+    classified together, so sold-out or waitlist wording near a "Register"
+    button still wins. A CTA earns a small confidence boost only when the CTAs
+    and the windows each reach the same status on their own. Pages without a
+    decision there fall back to the body without its footer, scripts and styles.
+
+    Returns:
+        (status, confidence, excerpt) where excerpt is the text that decided it
+    """
+    if ctas or windows:
+        region_text = " | ".join(ctas + windows)
+        status, conf = classify(region_text)
+        if status != "unknown":
+            if ctas and windows and classify(" | ".join(ctas))[0] == status == classify(" | ".join(windows))[0]:
+                conf = min(0.99, round(conf + classification_config.ROI_CTA_CONFIDENCE_BOOST, 2))
+            return status, conf, region_text
+    status, conf = classify(body_text)
+    return status, conf, body_text
+
+def classify_page(soup: BeautifulSoup):
+    """Rule-based classification of a parsed page; returns (status, confidence, excerpt)."""
+    return classify_regions(*page_regions(soup))
+
+def score_batch(pages: list, model):
+    """
+    Re-score a batch of fetched pages with the feature-vector model in one pass.
+
+    Pages keep their rule-based result when there is no model or the model
+    can't decide ("unknown", which includes predictions below
+    classification.MIN_CONFIDENCE).
+    """
+    if model is None or not pages:
+        return
+    statuses, confidences = model.predict([p["features"] for p in pages])
+    for page, status, conf in zip(pages, statuses, confidences):
+        if status != "unknown":
+            page["status"], page["conf"], page["version"] = status, conf, model.version
+
+def get_events() -> list:
+    """Events to check, as compact roster.Event records."""
+    return events_from_pages(get_backend().select_pages("race_event", {**EVENTS_QUERY, "order": "event_id"}))
+
+def get_latest_observations(event_ids: list | None = None):
+    """Return the current observation run (roster.LatestRun) for each event (or just `event_ids`), keyed by event_id bytes."""
+    params = {"select": "observation_id,event_id,source,parsed_status,confidence,url,count", "order": "event_id"}
+    if event_ids is not None:
+        params["event_id"] = f"in.({','.join(event_ids)})"
+    return latest_runs_from_pages(get_backend().select_pages("latest_observation", params))
+
+def post_obs(event_id: str, url: str, status: str, conf: float, excerpt: str, previous: LatestRun | None = None,
+             classifier_version: str = CLASSIFIER_VERSION):
+    """
+    Record an observation in run-length form.
+
+    If it matches the event's current run (`previous`: same source, url and
+    status), extend that run (last_seen/count, and the latest confidence)
+    instead of appending a new row.
+
+    Returns:
+        observation_id of the row written, or None on failure
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    obs = {
+        "event_id": event_id,
+        "source": "official_site",
+        "raw_excerpt": excerpt[:retention.EXCERPT_MAX_CHARS],
+        "parsed_status": status,
+        "confidence": conf,
+        "url": url,
+        "classifier_version": classifier_version,
+    }
+    try:
+        if previous and previous.run_key() == run_key(obs["source"], url, status):
+            observation_id = uuid_str(previous.observation_id)
+            get_backend().update(
+                "status_observation",
+                {"last_seen": now, "count": previous.count + 1, "raw_excerpt": obs["raw_excerpt"], "confidence": conf},
+                {"observation_id": f"eq.{observation_id}"}
+            )
+            return observation_id
+        rows = get_backend().insert(
+            "status_observation",
+            [{**obs, "observed_at": now, "first_seen": now, "last_seen": now, "count": 1}]
+        )
+        return rows[0]["observation_id"] if rows else None
+    except StorageError as e:
+        logger.error(f"Failed to post observation for {event_id}: {e.status} {e.message}")
+        return None
+
+def fetch_page(url: str, policies: PolicyCache | None = None) -> dict:
+    """
+    Fetch a registration page and classify it with the rule-based classifier.
+
+    With `policies`, robots.txt is respected and throttling responses slow the
+    host down (see crawl_policy).
+
+    Returns:
+        page dict (status, conf, excerpt, version, content, seen_at, regions);
+        raises on fetch errors, non-2xx and non-HTML responses and pages cut
+        off at scraping.MAX_PAGE_BYTES before their content ended
+        (fetch.FetchError), 429/503 (fetch.Throttled) and disallowed URLs
+        (crawl_policy.Disallowed)
+    """
+    if policies:
+        policies.check(url)
+    try:
+        resp = fetch_html(url, headers=UA, stop_at=CONTENT_END_RE)
+    except Throttled as e:
+        if policies:
+            policies.throttled(url, e.retry_after)
+        raise
+    if policies:
+        policies.succeeded(url)
+    if resp.truncated:
+        # The part that decides the status may be in what wasn't read
+        raise FetchError(f"Page content continues past {scraping.MAX_PAGE_BYTES} bytes; not classified")
+    ctas, windows, body_text = page_regions(BeautifulSoup(resp.text, "html.parser"))
+    status, conf, excerpt = classify_regions(ctas, windows, body_text)
+    return {
+        "status": status,
+        "conf": conf,
+        "excerpt": excerpt[:retention.EXCERPT_MAX_CHARS],  # may be the whole body text; keep only what is stored
+        "version": CLASSIFIER_VERSION,
+        "content": resp.content,
+        "seen_at": datetime.now(timezone.utc).isoformat(),
+        "regions": (ctas, windows, body_text),
+    }
+
+def add_features(page: dict, timezone_name: str | None, model):
+    """Attach the feature vector score_batch() needs (only when a model is loaded)."""
+    if model:
+        page["features"] = page_features(*page["regions"], language_for(timezone=timezone_name), CATEGORY_RE)
+
+def record_pages(pages: list, latest: dict, store, ckpt: Checkpoint | None = None) -> int:
+    """
+    Record a batch of classified pages for every event that references them.
+
+    With a checkpoint, events it already counts as processed are skipped and
+    each event is marked done as soon as its observation is written, so
+    replaying a partly written batch doesn't count an event twice.
+
+    Returns:
+        number of events recorded
+    """
+    recorded = 0
+    for page in pages:
+        for ev in page["group"]:
+            if ckpt and ev.event_id in ckpt.processed:
+                continue
+            event_id = ev.id
+            observation_id = post_obs(event_id, ev.reg_url, page["status"], page["conf"],
+                                      page["excerpt"], latest.get(ev.event_id), page["version"])
+            if ckpt and observation_id:
+                ckpt.mark_done(ev.event_id)
+            if store and page.get("content") is not None:
+                try:
+                    store.record(event_id, ev.reg_url, page["content"], page["seen_at"],
+                                 status=page["status"], confidence=page["conf"], observation_id=observation_id)
+                except OSError as e:
+                    # The observation is already written; a missing snapshot only loses the raw page
+                    logger.error(f"Failed to store snapshot for {event_id}: {e}")
+            logger.debug(f"Checked {ev.series_id}/{ev.year}: {page['status']} "
+                         f"(confidence: {page['conf']:.2f})")
+            recorded += 1
+    return recorded
 
 def main():
+    parser = argparse.ArgumentParser(description="Fetch and classify registration pages.")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint instead of starting over")
+    args = parser.parse_args()
+
     logger.info("Fetching events to check...")
-    resp = requests.get(GET_EVENTS, headers=HDRS, timeout=45)
-    resp.raise_for_status()
-    events = resp.json()
+    events = get_events()
     logger.info(f"Retrieved {len(events)} events to verify")
+    latest = get_latest_observations()
+    store = get_snapshot_store()
+    if store:
+        logger.info(f"Storing page snapshots in {store.root}")
+
+    ckpt = Checkpoint.load() if args.resume else None
+    if ckpt:
+        logger.info(f"Resuming run {ckpt.run_id}: {len(ckpt.processed)} events already recorded, "
+                    f"{len(ckpt.pending)} unflushed results to replay")
+    else:
+        ckpt = Checkpoint(checkpoint_config.PATH)
+        logger.info(f"Starting run {ckpt.run_id}")
+    ckpt.save()
 
+    # Several events can share a registration page: fetch and classify each
+    # distinct URL once, then record the result for every event behind it.
+    done = ckpt.processed | {ev.event_id for page in ckpt.pending for ev in page["group"]}
+    by_url = defaultdict(list)
+    for ev in events:
+        if ev.reg_url and ev.event_id not in done:
+            by_url[normalize_url(ev.reg_url)].append(ev)
+    logger.info(f"{len(by_url)} distinct registration URLs across {len(events)} events")
+    del done
+
+    model = load_model()
+    sampler = EventSampler("check_availability")
+    policies = PolicyCache(headers=UA)
+    scheduler = HostScheduler(policies)
+    for group in by_url.values():
+        scheduler.add(group[0].reg_url, group)
+    del by_url  # the scheduler holds the groups; drop the normalized-URL keys
+    pending = ckpt.pending
     checked = 0
     failed = 0
-    for ev in events:
-        url = ev.get("reg_url")
-        if not url:
-            continue
-        try:
-            html = requests.get(url, headers=UA, timeout=25).text
-            soup = BeautifulSoup(html, "html.parser")
-            text = soup.get_text(" ", strip=True)
-            status, conf = classify(text)
-            post_obs(ev["event_id"], url, status, conf, text[:300])
-            logger.debug(f"Checked {ev.get('series_id')}/{ev.get('year')}: {status} (confidence: {conf:.2f})")
-            checked += 1
-            if checked % 10 == 0:
-                logger.info(f"Progress: checked {checked}/{len(events)} events")
-            time.sleep(1.0)  # be polite
-        except Exception as e:
-            failed += 1
-            logger.warning(f"Failed to fetch {ev.get('series_id')}/{ev.get('year')}: {e}")
-
-    logger.info(f"✅ Completed. Successfully checked {checked} events, {failed} failures")
+
+    def flush():
+        nonlocal checked
+        score_batch(pending, model)
+        checked += record_pages(pending, latest, store, ckpt)
+        pending.clear()
+        ckpt.save()
+
+    if pending:
+        flush()  # results fetched by the interrupted run
+    for url, group in scheduler:
+        with sampler.event(group[0].id):
+            try:
+                page = fetch_page(url, policies)
+            except Exception as e:
+                if isinstance(e, Throttled) and scheduler.retry():
+                    logger.info(f"{url} throttled ({e.status}); retrying later")
+                    continue
+                failed += len(group)
+                for ev in group:
+                    logger.warning(f"Failed to fetch {ev.series_id}/{ev.year}: {e}")
+                continue
+            add_features(page, group[0].event_timezone, model)
+
+        page["group"] = group
+        del page["regions"]  # only needed for features; don't hold page text for the batch
+        if not store:
+            page["content"] = None
+        pending.append(page)
+        if len(pending) >= database.BATCH_SIZE:
+            flush()
+            logger.info(f"Progress: checked {len(ckpt.processed)}/{len(events)} events")
+        elif len(pending) % checkpoint_config.EVERY_PAGES == 0:
+            ckpt.save()
+    flush()
+    policies.save()
+    ckpt.clear()
+    sampler.dump()
+
+    logger.info(f"✅ Completed run {ckpt.run_id}. Successfully checked {checked} events, {failed} failures")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiled_main(main)
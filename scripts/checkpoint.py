@@ -0,0 +1,137 @@
+# scripts/checkpoint.py
+"""
+Crawl checkpoints for resuming interrupted availability checks.
+
+check_availability saves its progress (run id, events already recorded, and
+fetched results not yet written to the database) to a local JSON file every
+few pages and after every batch write. Each event is also appended to a
+journal next to it as soon as its observation is written, so a run that dies
+halfway through a batch doesn't record those events twice. `--resume` picks
+the run up where it stopped: finished events are skipped and the unflushed
+results are written first. The files are removed when the crawl completes, so
+while they exist the crawl is unfinished and resolve_latest refuses to run.
+Completion also leaves a marker naming the run, so a copy of that run's
+checkpoint restored later (e.g. an older CI cache entry) is not resumed.
+"""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from config import checkpoint as checkpoint_config
+from logger import setup_logger
+from roster import Event, uuid_bytes, uuid_str
+
+logger = setup_logger(__name__)
+
+# Completed run_ids remembered in the completion marker
+COMPLETED_RUNS_KEPT = 30
+
+
+class Checkpoint:
+    """Progress of one crawl run."""
+
+    def __init__(self, path: str, run_id: str | None = None, started_at: str | None = None,
+                 processed: list | None = None, pending: list | None = None):
+        self.path = path
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = started_at or datetime.now(timezone.utc).isoformat()
+        self.processed = set(processed or [])   # event_ids (roster.uuid_bytes) whose results are in the database
+        self.pending = pending or []            # fetched pages not yet written (groups of roster.Event)
+        self._journal = None
+
+    @staticmethod
+    def completed_path(path: str) -> str:
+        """Marker naming the runs that completed most recently (see clear())."""
+        return path + ".completed"
+
+    @property
+    def journal_path(self) -> str:
+        """Event ids written since the last save(), one per line."""
+        return self.path + ".done"
+
+    @classmethod
+    def load(cls, path: str | None = None) -> "Checkpoint | None":
+        """The saved run at `path`, or None if there is none or it is too old to resume."""
+        path = path or checkpoint_config.PATH
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+        if data["run_id"] in completed_runs(path):
+            logger.warning(f"Checkpoint for run {data['run_id']} belongs to a completed crawl; starting a new run")
+            return None
+        started = datetime.fromisoformat(data["started_at"])
+        if datetime.now(timezone.utc) - started > timedelta(hours=checkpoint_config.MAX_AGE_HOURS):
+            logger.warning(f"Checkpoint for run {data['run_id']} is from {data['started_at']}; starting a new run")
+            return None
+        for page in data["pending"]:
+            page["group"] = [Event.from_row(row) for row in page["group"]]
+        processed = list(map(uuid_bytes, data["processed"]))
+        if os.path.exists(path + ".done"):
+            with open(path + ".done", encoding="utf-8") as f:
+                processed += [uuid_bytes(line.strip()) for line in f if line.strip()]
+        return cls(path, data["run_id"], data["started_at"], processed, data["pending"])
+
+    def mark_done(self, event_id: bytes | str):
+        """Record that an event's result is in the database (journaled immediately)."""
+        self.processed.add(event_id)
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(uuid_str(event_id) + "\n")
+        self._journal.flush()
+
+    def _drop_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def save(self):
+        """Atomically write the checkpoint (page content is not kept)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "processed": sorted(map(uuid_str, self.processed)),
+            "pending": [{**{k: v for k, v in page.items() if k != "content"},
+                         "group": [ev.to_row() for ev in page["group"]]} for page in self.pending],
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+        self._drop_journal()  # its events are in "processed" now
+
+    def clear(self):
+        """Remove the checkpoint once the crawl has completed, leaving a completion marker."""
+        self._drop_journal()
+        recent = [r for r in completed_runs(self.path) if r != self.run_id][-(COMPLETED_RUNS_KEPT - 1):]
+        marker = {"run_ids": recent + [self.run_id], "completed_at": datetime.now(timezone.utc).isoformat()}
+        tmp = self.completed_path(self.path) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+        os.replace(tmp, self.completed_path(self.path))
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def completed_runs(path: str | None = None) -> list:
+    """run_ids of the most recent completed crawls, oldest first."""
+    marker = Checkpoint.completed_path(path or checkpoint_config.PATH)
+    try:
+        with open(marker, encoding="utf-8") as f:
+            return json.load(f).get("run_ids", [])
+    except (OSError, ValueError):
+        return []
+
+
+def crawl_in_progress(path: str | None = None) -> bool:
+    """True while a crawl has started but not completed."""
+    return os.path.exists(path or checkpoint_config.PATH)
@@ -0,0 +1,153 @@
+# scripts/compact_observations.py
+"""
+Compact status_observation into run-length form and apply excerpt retention.
+
+Consecutive identical observations of an event (same source, url and
+status) are collapsed into one row spanning first_seen..last_seen with a
+count of how many checks it represents and the latest confidence. The crawler writes new observations in
+this form already; this job folds in older rows and clears stale excerpts, so
+the table grows with status changes rather than with days elapsed.
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from config import database, retention
+from logger import setup_logger
+from storage import get_backend
+from profiling import profiled_main
+
+logger = setup_logger(__name__)
+
+OBS_COLUMNS = (
+    "observation_id,event_id,source,parsed_status,confidence,url,"
+    "raw_excerpt,observed_at,first_seen,last_seen,count"
+)
+
+
+def run_key(source: str | None, url: str | None, parsed_status: str | None) -> tuple:
+    """
+    Fields that must match for two consecutive observations to share a run.
+
+    Confidence is left out: a model's confidence moves a little with every
+    edit to a page, and a run keeps the latest value instead.
+    """
+    return source, url, parsed_status or "unknown"
+
+
+def row_run_key(obs: dict) -> tuple:
+    """run_key() of a status_observation row."""
+    return run_key(obs.get("source"), obs.get("url"), obs.get("parsed_status"))
+
+
+def first_seen(obs: dict) -> str:
+    return obs.get("first_seen") or obs.get("observed_at") or ""
+
+
+def last_seen(obs: dict) -> str:
+    return obs.get("last_seen") or obs.get("observed_at") or ""
+
+
+def plan_compaction(rows: list) -> tuple:
+    """
+    Work out which rows to merge and which to delete.
+
+    Args:
+        rows: status_observation rows (any order; all rows of each event they include)
+
+    Returns:
+        (updates, deletes): updates is a list of (observation_id, values) for
+        the surviving head of each run; deletes is a list of observation_ids
+        folded into a head.
+    """
+    by_event = defaultdict(list)
+    for row in rows:
+        by_event[row["event_id"]].append(row)
+
+    updates, deletes = [], []
+    for obs in by_event.values():
+        obs.sort(key=first_seen)
+        runs = [[obs[0]]]
+        for o in obs[1:]:
+            if row_run_key(o) == row_run_key(runs[-1][-1]):
+                runs[-1].append(o)
+            else:
+                runs.append([o])
+
+        for run in runs:
+            head = run[0]
+            if len(run) == 1 and head.get("first_seen") and head.get("last_seen"):
+                continue  # already compact
+            updates.append((head["observation_id"], {
+                "first_seen": first_seen(head),
+                "last_seen": max(last_seen(o) for o in run),
+                "count": sum(o.get("count") or 1 for o in run),
+                # Keep the most recent excerpt and confidence of the run
+                "raw_excerpt": next((o["raw_excerpt"] for o in reversed(run) if o.get("raw_excerpt")), None),
+                "confidence": run[-1].get("confidence"),
+            }))
+            deletes.extend(o["observation_id"] for o in run[1:])
+    return updates, deletes
+
+
+def apply_retention(days: int) -> None:
+    """Clear raw_excerpt on observation runs not seen within the last `days` days."""
+    if days <= 0:
+        return
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    get_backend().update(
+        "status_observation",
+        {"raw_excerpt": None},
+        {"last_seen": f"lt.{cutoff}", "raw_excerpt": "not.is.null"}
+    )
+    logger.info(f"Cleared excerpts on observations last seen before {cutoff[:10]}")
+
+
+def event_observations(db, event_id: str) -> list:
+    """All status_observation rows of one event, oldest first."""
+    params = {"select": OBS_COLUMNS, "event_id": f"eq.{event_id}", "order": "first_seen,observation_id"}
+    return [row for page in db.select_pages("status_observation", params) for row in page]
+
+
+def compact_event(db, rows: list, dry_run: bool = False) -> tuple:
+    """Plan and (unless dry_run) apply the compaction of one event's rows; returns (merged runs, folded rows)."""
+    updates, deletes = plan_compaction(rows)
+    if not dry_run:
+        for observation_id, values in updates:
+            db.update("status_observation", values, {"observation_id": f"eq.{observation_id}"})
+        for i in range(0, len(deletes), database.BATCH_SIZE):
+            chunk = deletes[i:i + database.BATCH_SIZE]
+            db.delete("status_observation", {"observation_id": f"in.({','.join(chunk)})"})
+    return len(updates), len(deletes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--retention-days", type=int, default=retention.EXCERPT_RETENTION_DAYS,
+                        help="clear excerpts on runs last seen more than N days ago (0 = keep)")
+    args = parser.parse_args()
+
+    db = get_backend()
+    # Only events with rows left to fold are read back; the list is collected
+    # up front because compacting an event drops it from the view, which would
+    # shift the offsets of later pages.
+    event_ids = [row["event_id"] for page in db.select_pages("compaction_candidate", {"select": "event_id", "order": "event_id"})
+                 for row in page]
+    logger.info(f"Compacting observations of {len(event_ids)} events...")
+    # One event at a time: a run can only be merged when all of its event's rows are in hand
+    total = merged = folded = 0
+    for event_id in event_ids:
+        rows = event_observations(db, event_id)
+        n_updates, n_deletes = compact_event(db, rows, args.dry_run)
+        total, merged, folded = total + len(rows), merged + n_updates, folded + n_deletes
+    logger.info(f"{total} observations read: {merged} runs merged, {folded} rows folded away")
+
+    if args.dry_run:
+        logger.info("Dry run, no changes written")
+        return
+
+    apply_retention(args.retention_days)
+    logger.info(f"✅ Compaction complete. {folded} observation rows removed")
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -12,16 +12,55 @@ class ScrapingConfig:
     # HTTP request timeout in seconds
     REQUEST_TIMEOUT: int = 25
 
-    # Delay between requests in seconds (be polite to race websites)
+    # Delay between requests to the same host, in seconds, unless its robots.txt
+    # sets a Crawl-delay (be polite to race websites; see CrawlPolicyConfig)
     SCRAPE_DELAY: float = 1.0
 
     # Maximum retry attempts for failed requests
     MAX_RETRIES: int = 3
 
+    # Most bytes read from one page; pages whose content hasn't ended by then are skipped
+    MAX_PAGE_BYTES: int = 2_000_000
+
+    # Streaming read size
+    CHUNK_BYTES: int = 64 * 1024
+
+    # Redirects followed before giving up on a page
+    MAX_REDIRECTS: int = 5
+
     # User agent string for HTTP requests
     USER_AGENT: str = "Mozilla/5.0 (RaceRadarBot/1.0; +https://github.com/yourusername/raceradar)"
 
 
+@dataclass
+class CrawlPolicyConfig:
+    """Configuration for per-host crawl policies (scripts/crawl_policy.py)."""
+    # Product token matched against robots.txt User-agent lines
+    ROBOTS_AGENT: str = "RaceRadarBot"
+
+    # robots.txt and throttling state per host, kept between runs
+    CACHE_PATH: str = "data/robots_cache.json"
+
+    # robots.txt is fetched again once the cached copy is older than this
+    ROBOTS_TTL_HOURS: int = 24
+
+    # Only this much of a robots.txt is read (RFC 9309 asks for at least 500 KiB)
+    ROBOTS_MAX_BYTES: int = 512 * 1024
+
+    # Shortest gap honoured from a site's Crawl-delay/Request-rate (a declared 0 is not taken literally)
+    MIN_DELAY: float = 0.5
+
+    # After a 429/503 a host's delay is multiplied by this, up to MAX_BACKOFF times its base delay
+    BACKOFF_FACTOR: float = 2.0
+    MAX_BACKOFF: float = 32.0
+
+    # Successful fetches in a row before a throttled host's backoff is halved
+    RECOVER_AFTER: int = 5
+
+    # Longest Retry-After honoured within a run; hosts asking for more are skipped until the next run
+    MAX_RETRY_AFTER_SECONDS: int = 600
+
+
 @dataclass
 class ClassificationConfig:
     """Configuration for status classification."""
@@ -34,6 +73,15 @@ class ClassificationConfig:
     # Maximum number of different statuses allowed in the anti-flap window
     MAX_STATUS_CHANGES: int = 2
 
+    # Characters of context kept either side of a keyword hit when extracting page regions
+    ROI_WINDOW_CHARS: int = 150
+
+    # Confidence added when a CTA button/link itself agrees with the region classification
+    ROI_CTA_CONFIDENCE_BOOST: float = 0.05
+
+    # Trained feature-vector model (scripts/feature_classifier.py); rule-based classify() is used without it
+    MODEL_PATH: str = "data/classifier_model.npz"
+
 
 @dataclass
 class DatabaseConfig:
@@ -44,6 +92,147 @@ class DatabaseConfig:
     # Default timeout for Supabase API calls in seconds
     DB_TIMEOUT: int = 45
 
+    # Storage backend: "supabase" (production) or "sqlite" (local/offline runs).
+    # Overridden by the RACERADAR_BACKEND environment variable.
+    BACKEND: str = "supabase"
+
+    # SQLite database file for the local backend (overridden by RACERADAR_SQLITE_PATH)
+    SQLITE_PATH: str = "data/raceradar.db"
+
+    # The change feed only returns status_change rows at least this old. The
+    # resolver and the watch daemon write concurrently, so change_ids can commit
+    # out of order; this must exceed the longest insert (DB_TIMEOUT) plus clock skew.
+    CHANGE_SETTLE_SECONDS: int = 120
+
+
+@dataclass
+class CheckpointConfig:
+    """Configuration for resumable availability checks (scripts/checkpoint.py)."""
+    # Where check_availability keeps its progress while a crawl is running
+    PATH: str = "data/checkpoints/check_availability.json"
+
+    # Save progress after this many fetched pages (and after every batch write)
+    EVERY_PAGES: int = 10
+
+    # Older checkpoints are abandoned and --resume starts over. The nightly run
+    # starts every 24h (cron 0 2 * * *) and scheduled workflows can start late,
+    # so this must exceed 24 for a failed run to be resumed the next night.
+    MAX_AGE_HOURS: int = 26
+
+
+@dataclass
+class RetentionConfig:
+    """Configuration for status_observation compaction and excerpt retention."""
+    # Maximum characters of page text stored per observation
+    EXCERPT_MAX_CHARS: int = 500
+
+    # Excerpts on observation runs last seen longer ago than this are cleared (0 = keep forever)
+    EXCERPT_RETENTION_DAYS: int = 30
+
+
+@dataclass
+class SnapshotConfig:
+    """Configuration for the local page snapshot store."""
+    # Whether the crawler stores fetched pages (also enabled by setting RACERADAR_SNAPSHOT_DIR)
+    ENABLED: bool = False
+
+    # Root directory of the store (overridden by RACERADAR_SNAPSHOT_DIR)
+    ROOT: str = "data/snapshots"
+
+    # Compression codec: "zstd" (needs the zstandard package) or "gzip"
+    COMPRESSION: str = "zstd"
+
+    ZSTD_LEVEL: int = 10
+    GZIP_LEVEL: int = 6
+
+
+@dataclass
+class ExportConfig:
+    """Configuration for static JSON exports of the public views."""
+    # Directory the export stage writes to (served by the website/CDN)
+    OUTPUT_DIR: str = "data/export"
+
+
+@dataclass
+class SearchConfig:
+    """Configuration for the in-memory race search service."""
+    HOST: str = "127.0.0.1"
+    PORT: int = 8080
+
+    # Seconds between change-feed refreshes while serving
+    REFRESH_SECONDS: int = 60
+
+    # Distinct queries kept in the LRU result cache
+    CACHE_SIZE: int = 1024
+
+    # Most races one HTTP search returns (also the default when no limit is given)
+    MAX_LIMIT: int = 500
+
+
+@dataclass
+class WatchConfig:
+    """Configuration for the hot-set watch daemon (scripts/watch.py)."""
+    # Minutes between checks of a hot race during local business hours
+    POLL_MINUTES: int = 2
+
+    # Minutes between checks outside business hours
+    OFF_HOURS_POLL_MINUTES: int = 60
+
+    # Local business hours in the race's timezone, [start, end)
+    BUSINESS_HOURS_START: int = 8
+    BUSINESS_HOURS_END: int = 20
+
+    # A not_yet_open race is hot from this many hours before its expected opening...
+    OPENING_LOOKAHEAD_HOURS: int = 48
+    # ...until this many hours after it (openings slip)
+    OPENING_GRACE_HOURS: int = 24
+
+    # Within this many minutes of the expected opening, poll at POLL_MINUTES even off-hours
+    OPENING_IMMINENT_MINUTES: int = 60
+
+    # A race is volatile (hot) after this many changes between known statuses within VOLATILE_DAYS
+    VOLATILE_CHANGES: int = 2
+    VOLATILE_DAYS: int = 7
+
+    # Minutes between hot-set rebuilds, and the most races watched at once
+    HOT_SET_REFRESH_MINUTES: int = 15
+    MAX_HOT_EVENTS: int = 100
+
+    # Used for races without an event_timezone
+    DEFAULT_TIMEZONE: str = "UTC"
+
+
+@dataclass
+class MatchingConfig:
+    """Configuration for fuzzy race-name matching (scripts/name_match.py)."""
+    # Minimum score (0-1) for a fuzzy match to be used
+    MIN_SCORE: float = 0.7
+
+    # Entries fully scored per query (those sharing the most rare trigrams)
+    CANDIDATES: int = 20
+
+    # Tokens in more entries than this are too common to select candidates by
+    MAX_POSTINGS: int = 500
+
+    # Trigrams of unseen (misspelt) query tokens used to select candidates, rarest first
+    SELECT_GRAMS: int = 8
+
+    # Trigram similarity at which a misspelt token counts as (partly) matching
+    TOKEN_SIMILARITY: float = 0.5
+
+
+@dataclass
+class ProfilingConfig:
+    """Configuration for --profile reports (scripts/profiling.py)."""
+    # Directory for .prof files and text reports
+    OUTPUT_DIR: str = "data/profiles"
+
+    # Functions / allocation sites listed in the text reports
+    TOP_N: int = 30
+
+    # Stack frames kept per allocation by tracemalloc (more = slower)
+    TRACEMALLOC_FRAMES: int = 1
+
 
 @dataclass
 class LoggingConfig:
@@ -57,8 +246,17 @@ class LoggingConfig:
 
 # Singleton instances
 scraping = ScrapingConfig()
+crawl_policy = CrawlPolicyConfig()
 classification = ClassificationConfig()
 database = DatabaseConfig()
+checkpoint = CheckpointConfig()
+retention = RetentionConfig()
+snapshots = SnapshotConfig()
+export = ExportConfig()
+search = SearchConfig()
+watch = WatchConfig()
+matching = MatchingConfig()
+profiling = ProfilingConfig()
 logging_config = LoggingConfig()
 
 
@@ -121,3 +319,17 @@ EU_COUNTRIES = {
     "Hungary", "Romania", "Slovenia", "Estonia", "Bosnia & Herzegovina",
     "Luxembourg",
 }
+
+# Main page language by country, used as a classifier feature (default: "other")
+COUNTRY_LANGUAGE = {
+    "UK": "en", "United Kingdom": "en", "England": "en", "Ireland": "en", "Northern Ireland": "en",
+    "USA": "en", "Canada": "en", "Australia": "en", "New Zealand": "en", "Singapore": "en",
+    "South Africa": "en",
+    "Germany": "de", "Austria": "de", "Switzerland": "de",
+    "France": "fr", "Belgium": "fr", "Luxembourg": "fr", "Morocco": "fr",
+    "Spain": "es", "Argentina": "es", "Mexico": "es",
+    "Portugal": "pt",
+    "Italy": "it",
+    "Netherlands": "nl",
+    "Denmark": "nordic", "Sweden": "nordic", "Norway": "nordic", "Finland": "nordic",
+}
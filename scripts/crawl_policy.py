@@ -0,0 +1,308 @@
+# scripts/crawl_policy.py
+"""
+Per-host crawl policies: robots.txt, Crawl-delay and throttling.
+
+Every host gets its own pace instead of one global SCRAPE_DELAY. Its
+robots.txt is fetched at most once per ROBOTS_TTL_HOURS (the rules that apply
+to us are cached in CACHE_PATH between runs), URLs it disallows are never
+fetched, and its Crawl-delay/Request-rate, when declared, replaces the default
+per-host delay, in either direction. A 429 or 503 multiplies the host's delay
+(and honours Retry-After); a run of successful fetches brings it back down.
+
+HostScheduler interleaves hosts, so while one host cools down the next ready
+one is fetched. The crawl only sleeps when every remaining host is waiting.
+"""
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import requests
+from config import crawl_policy as policy_config, scraping
+from fetch import FetchError, get_session
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RULE_FIELDS = {"allow", "disallow", "crawl-delay", "request-rate"}
+
+
+class Disallowed(FetchError):
+    """robots.txt disallows the URL, or the host asked us to stay away for this run."""
+
+
+class RobotsUnavailable(Exception):
+    """robots.txt couldn't be fetched (network error or server error)."""
+
+
+def host_of(url: str) -> str:
+    """Lowercased host[:port] of a URL."""
+    return urlsplit(url.strip()).netloc.rsplit("@", 1)[-1].lower()
+
+
+def default_delay() -> float:
+    """Seconds between requests to a host without a declared delay (RACERADAR_SCRAPE_DELAY overrides)."""
+    return float(os.environ.get("RACERADAR_SCRAPE_DELAY") or scraping.SCRAPE_DELAY)
+
+
+def relevant_rules(text: str) -> str:
+    """The groups of a robots.txt that apply to us (our agent or "*"), to keep the cache small."""
+    agent = policy_config.ROBOTS_AGENT.lower()
+    groups = []  # (agents, rules)
+    for raw in text.splitlines():
+        field, sep, value = raw.split("#", 1)[0].partition(":")
+        field, value = field.strip().lower(), value.strip()
+        if not sep:
+            continue
+        if field == "user-agent":
+            if not groups or groups[-1][1]:
+                groups.append(([], []))
+            groups[-1][0].append(value)
+        elif field in RULE_FIELDS and groups:
+            groups[-1][1].append(f"{field}: {value}")
+    lines = []
+    for agents, rules in groups:
+        if any(a == "*" or (a and a.lower() in agent) for a in agents):
+            lines += [f"user-agent: {a}" for a in agents] + rules + [""]
+    return "\n".join(lines)
+
+
+def fetch_robots(url: str, headers: dict | None = None) -> str | None:
+    """
+    Fetch the robots.txt governing `url`.
+
+    Returns:
+        the rules that apply to us, or None when the host has no robots.txt
+        (any 4xx, as RFC 9309 says: crawling is then unrestricted)
+
+    Raises:
+        RobotsUnavailable: network errors, 429 and 5xx
+    """
+    parts = urlsplit(url.strip())
+    robots_url = f"{parts.scheme or 'https'}://{parts.netloc}/robots.txt"
+    try:
+        with get_session().get(robots_url, headers=headers, timeout=scraping.REQUEST_TIMEOUT, stream=True) as resp:
+            if resp.status_code == 429 or resp.status_code >= 500:
+                raise RobotsUnavailable(f"{robots_url} returned {resp.status_code}")
+            if resp.status_code >= 400:
+                return None
+            content, size = [], 0
+            for chunk in resp.iter_content(chunk_size=scraping.CHUNK_BYTES):
+                content.append(chunk)
+                size += len(chunk)
+                if size >= policy_config.ROBOTS_MAX_BYTES:
+                    break
+    except requests.RequestException as e:
+        raise RobotsUnavailable(f"{robots_url}: {e}") from e
+    text = b"".join(content)[:policy_config.ROBOTS_MAX_BYTES].decode("utf-8", errors="replace")
+    return relevant_rules(text)
+
+
+class HostPolicy:
+    """What one host allows: robots rules, request spacing and throttling state."""
+
+    def __init__(self, host: str, robots: str | None = None, fetched_at: str | None = None, backoff: float = 1.0):
+        self.host = host
+        self.robots = robots
+        self.fetched_at = fetched_at    # when robots was fetched (None: never fetched successfully)
+        self.backoff = backoff          # delay multiplier after throttling (1.0 = none)
+        self.loaded_at = time.monotonic()
+        self.next_at = 0.0              # monotonic time of the next permitted request
+        self.successes = 0
+        self.deferred = False           # Retry-After beyond this run; skip the host
+
+        self.parser = RobotFileParser()
+        if robots is None:
+            self.parser.allow_all = True
+        else:
+            self.parser.parse(robots.splitlines())
+        declared = self._declared_delay()
+        self.base_delay = default_delay() if declared is None else max(declared, policy_config.MIN_DELAY)
+
+    def _declared_delay(self) -> float | None:
+        agent = policy_config.ROBOTS_AGENT
+        delays = []
+        crawl_delay = self.parser.crawl_delay(agent)
+        if crawl_delay is not None:
+            delays.append(float(crawl_delay))
+        rate = self.parser.request_rate(agent)
+        if rate and rate.requests:
+            delays.append(rate.seconds / rate.requests)
+        return max(delays) if delays else None
+
+    @property
+    def delay(self) -> float:
+        """Current gap between requests to this host, in seconds."""
+        if self.backoff <= 1.0:
+            return self.base_delay
+        return max(self.base_delay, policy_config.MIN_DELAY) * self.backoff
+
+    def permits(self, url: str) -> bool:
+        return not self.deferred and self.parser.can_fetch(policy_config.ROBOTS_AGENT, url)
+
+    def claim(self):
+        """Record a request starting now."""
+        self.next_at = time.monotonic() + self.delay
+
+    def throttled(self, retry_after: float | None = None):
+        """The host answered 429/503: slow down, and wait at least `retry_after` seconds."""
+        self.successes = 0
+        self.backoff = min(self.backoff * policy_config.BACKOFF_FACTOR, policy_config.MAX_BACKOFF)
+        if retry_after is not None and retry_after > policy_config.MAX_RETRY_AFTER_SECONDS:
+            logger.warning(f"{self.host} asked us to retry after {retry_after:.0f}s; skipping it this run")
+            self.deferred = True
+        wait = max(self.delay, retry_after or 0.0)
+        self.next_at = max(self.next_at, time.monotonic() + wait)
+
+    def succeeded(self):
+        """A fetch went through; after RECOVER_AFTER in a row, halve the backoff."""
+        if self.backoff <= 1.0:
+            return
+        self.successes += 1
+        if self.successes >= policy_config.RECOVER_AFTER:
+            self.backoff, self.successes = max(1.0, self.backoff / 2), 0
+
+    def to_json(self) -> dict:
+        return {"robots": self.robots, "fetched_at": self.fetched_at, "backoff": self.backoff}
+
+
+class PolicyCache:
+    """HostPolicy per host, persisted to CACHE_PATH between runs."""
+
+    def __init__(self, path: str | None = None, headers: dict | None = None):
+        self.path = path or policy_config.CACHE_PATH
+        self.headers = headers
+        self.saved = {}       # host -> to_json() from earlier runs
+        self.policies = {}    # host -> HostPolicy used in this run
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable robots cache {self.path}: {e}")
+
+    def get(self, url: str) -> HostPolicy:
+        """The policy for `url`'s host, fetching its robots.txt if the cached copy is missing or stale."""
+        host = host_of(url)
+        policy = self.policies.get(host)
+        ttl = policy_config.ROBOTS_TTL_HOURS * 3600
+        if policy is None or time.monotonic() - policy.loaded_at > ttl:
+            policy = self.policies[host] = self._load(host, url, policy)
+        return policy
+
+    def _load(self, host: str, url: str, current: HostPolicy | None) -> HostPolicy:
+        saved = current.to_json() if current else self.saved.get(host, {})
+        robots, fetched_at, backoff = saved.get("robots"), saved.get("fetched_at"), saved.get("backoff", 1.0)
+        ttl = timedelta(hours=policy_config.ROBOTS_TTL_HOURS)
+        now = datetime.now(timezone.utc)
+        if not fetched_at or now - datetime.fromisoformat(fetched_at) >= ttl:
+            try:
+                robots, fetched_at = fetch_robots(url, self.headers), now.isoformat()
+            except RobotsUnavailable as e:
+                # Keep the last known rules; with none, crawl cautiously and try again next time
+                logger.warning(f"robots.txt unavailable for {host}: {e}")
+                if not fetched_at:
+                    backoff = min(backoff * policy_config.BACKOFF_FACTOR, policy_config.MAX_BACKOFF)
+        policy = HostPolicy(host, robots, fetched_at, backoff)
+        if current:
+            policy.next_at, policy.deferred = current.next_at, current.deferred
+        return policy
+
+    def check(self, url: str) -> HostPolicy:
+        """
+        The policy for `url`, if we may fetch it.
+
+        Raises:
+            Disallowed: robots.txt disallows it, or the host deferred us to a later run
+        """
+        policy = self.get(url)
+        if policy.deferred:
+            raise Disallowed(f"{policy.host} asked us to come back later")
+        if not policy.permits(url):
+            raise Disallowed("Disallowed by robots.txt")
+        return policy
+
+    def throttled(self, url: str, retry_after: float | None = None):
+        self.get(url).throttled(retry_after)
+
+    def succeeded(self, url: str):
+        self.get(url).succeeded()
+
+    def save(self):
+        """Atomically write every known host's robots rules and backoff."""
+        data = {**self.saved, **{host: p.to_json() for host, p in self.policies.items()}}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+class HostScheduler:
+    """
+    Yields queued (url, item) pairs as soon as their host's policy permits.
+
+    Hosts are kept in a heap by the time of their next permitted request, so
+    the crawl fetches from whichever host is ready and only sleeps when none
+    is. URLs the policy won't fetch (robots.txt, deferred hosts) are yielded
+    without waiting; the fetch then raises Disallowed.
+    """
+
+    def __init__(self, policies: PolicyCache, sleep=time.sleep):
+        self.policies = policies
+        self.sleep = sleep
+        self.queues = defaultdict(deque)   # host -> deque of [url, item, attempts]
+        self.heap = []                     # (ready_at, seq, host) for hosts with queued URLs
+        self.scheduled = set()             # hosts in the heap
+        self._seq = itertools.count()
+        self._current = None
+
+    def __len__(self):
+        return sum(len(q) for q in self.queues.values())
+
+    def add(self, url: str, item, attempts: int = 0):
+        host = host_of(url)
+        self.queues[host].append([url, item, attempts])
+        if host not in self.scheduled:
+            known = self.policies.policies.get(host)
+            self._schedule(host, known.next_at if known else 0.0)
+
+    def _schedule(self, host: str, ready_at: float):
+        heapq.heappush(self.heap, (ready_at, next(self._seq), host))
+        self.scheduled.add(host)
+
+    def retry(self) -> bool:
+        """Queue the item just yielded again (it was throttled); False once it used scraping.MAX_RETRIES."""
+        url, item, attempts = self._current
+        if attempts >= scraping.MAX_RETRIES:
+            return False
+        self.add(url, item, attempts + 1)
+        return True
+
+    def __iter__(self):
+        while self.heap:
+            ready_at, _, host = heapq.heappop(self.heap)
+            self.scheduled.discard(host)
+            queue = self.queues[host]
+            url = queue[0][0]
+            policy = self.policies.get(url)
+            permitted = policy.permits(url)
+            if permitted and policy.next_at > ready_at:
+                # Throttled since it was scheduled; another host may be ready first
+                self._schedule(host, policy.next_at)
+                continue
+            wait = policy.next_at - time.monotonic()
+            if permitted and wait > 0:
+                self.sleep(wait)
+            self._current = queue.popleft()
+            if permitted:
+                policy.claim()
+            yield self._current[0], self._current[1]
+            if not queue:
+                del self.queues[host]
+            elif host not in self.scheduled:  # (retry() may have rescheduled it)
+                self._schedule(host, policy.next_at)
@@ -0,0 +1,157 @@
+# scripts/export_views.py
+"""
+Export the public race views as static, precompressed JSON files.
+
+Materialises `open_races`, `recently_sold_out` and per-country / per-distance
+slices of open races so the website can serve them from a CDN instead of
+querying the database on every page view:
+
+    <out>/open_races.json (+ .json.gz, .json.br)
+    <out>/recently_sold_out.json
+    <out>/open_races/country/<country>.json
+    <out>/open_races/distance/<distance>.json
+    <out>/manifest.json   (path -> content-hash ETag, size)
+
+Files are only rewritten when their content changes, so ETags and
+Last-Modified stay stable between pipeline runs.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from collections import defaultdict
+from slugify import slugify
+from config import export as export_config
+from logger import setup_logger
+from storage import get_backend
+from profiling import profiled_main
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = setup_logger(__name__)
+
+DISTANCE_SLUGS = {42.195: "marathon", 21.097: "half-marathon", 10: "10k", 5: "5k"}
+
+# Touched by every resolver run even when nothing changed; exporting them would
+# rewrite every file (and bust every ETag) nightly.
+VOLATILE_FIELDS = {"last_checked_at"}
+
+# Stable order for paging through each view (the view's own order, then event_id
+# as a unique tie-breaker); event_id is only selected for this and isn't exported
+VIEW_ORDER = {
+    "open_races": "event_local_date.nullslast,event_id",
+    "recently_sold_out": "last_checked_at.desc,event_id",
+}
+
+
+def distance_slug(distance_km) -> str:
+    if distance_km is None:
+        return "unknown"
+    return DISTANCE_SLUGS.get(round(float(distance_km), 3), "other")
+
+
+def build_exports() -> dict:
+    """Return {relative path: rows} for every file to export."""
+    db = get_backend()
+
+    def rows_of(view):
+        return [{k: v for k, v in row.items() if k not in VOLATILE_FIELDS and k != "event_id"}
+                for page in db.select_pages(view, {"order": VIEW_ORDER[view]}) for row in page]
+
+    open_races = rows_of("open_races")
+    exports = {
+        "open_races.json": open_races,
+        "recently_sold_out.json": rows_of("recently_sold_out"),
+    }
+    by_country, by_distance = defaultdict(list), defaultdict(list)
+    for race in open_races:
+        by_country[slugify(race.get("country") or "unknown")].append(race)
+        by_distance[distance_slug(race.get("distance_km"))].append(race)
+    for slug, rows in by_country.items():
+        exports[f"open_races/country/{slug}.json"] = rows
+    for slug, rows in by_distance.items():
+        exports[f"open_races/distance/{slug}.json"] = rows
+    return exports
+
+
+def encode(rows: list) -> bytes:
+    """Deterministic JSON encoding, so unchanged data hashes the same."""
+    return json.dumps(rows, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def variants(body: bytes) -> dict:
+    """File suffix -> bytes for the plain and precompressed variants."""
+    out = {"": body, ".gz": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out[".br"] = brotli.compress(body, quality=11)
+    return out
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def export(out_dir: str) -> tuple:
+    """
+    Write changed export files and drop ones no longer produced.
+
+    Returns:
+        (written, unchanged, removed) file counts
+    """
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    old_manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            old_manifest = json.load(f)
+
+    manifest, written, unchanged = {}, 0, 0
+    for rel_path, rows in sorted(build_exports().items()):
+        body = encode(rows)
+        etag = etag_for(body)
+        manifest[rel_path] = {"etag": etag, "bytes": len(body), "rows": len(rows)}
+        path = os.path.join(out_dir, rel_path)
+        if old_manifest.get(rel_path, {}).get("etag") == etag and os.path.exists(path):
+            unchanged += 1
+            continue
+        for suffix, data in variants(body).items():
+            _write(path + suffix, data)
+        written += 1
+
+    removed = 0
+    for rel_path in set(old_manifest) - set(manifest):
+        for suffix in ("", ".gz", ".br"):
+            path = os.path.join(out_dir, rel_path + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+        removed += 1
+
+    if manifest != old_manifest:
+        _write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return written, unchanged, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export public race views as static JSON files.")
+    parser.add_argument("--out", default=export_config.OUTPUT_DIR, help="output directory")
+    args = parser.parse_args()
+
+    if brotli is None:
+        logger.warning("brotli not installed; writing .json and .json.gz only")
+    written, unchanged, removed = export(args.out)
+    logger.info(f"✅ Export complete in {args.out}: {written} written, {unchanged} unchanged, {removed} removed")
+
+
+if __name__ == "__main__":
+    profiled_main(main)
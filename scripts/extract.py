@@ -0,0 +1,66 @@
+# scripts/extract.py
+"""
+Region-of-interest extraction for registration pages.
+
+Pulls out the parts of a page that decide its registration status (CTA
+buttons and links, keyword headings, and short text windows around keyword
+hits) so the classifier doesn't have to scan footers, news archives and
+sponsor blurbs.
+"""
+import re
+from bs4 import BeautifulSoup
+from config import classification
+
+# Elements whose label is a call to action or a section heading
+CTA_SELECTOR = "a, button, input[type=submit], input[type=button], [role=button], h1, h2, h3, h4"
+
+# Parts of the page that never carry the current registration status
+NOISE_TAGS = ["footer", "script", "style", "noscript", "template"]
+
+# Site-wide chrome: a "Register" link here is on every page whatever the race's status,
+# so elements inside these never count as CTAs (their text still counts as body text)
+CHROME_TAGS = ["nav", "header"]
+
+# Everything the extractor uses has arrived once one of these closes; the rest
+# is footer and scripts (see fetch.fetch_html stop_at)
+CONTENT_END_RE = re.compile(rb"</(?:main|body|html)\s*>", re.I)
+
+
+def extract_regions(soup: BeautifulSoup, pattern: re.Pattern, window: int | None = None) -> tuple:
+    """
+    Extract likely decision regions from a parsed page.
+
+    Note: removes footer/script/style elements from `soup`.
+
+    Args:
+        soup: Parsed page
+        pattern: Compiled regex matching any registration keyword (lowercase)
+        window: Characters of context kept either side of a keyword hit
+
+    Returns:
+        (ctas, windows, text): labels of CTA elements/headings matching a
+        keyword (outside nav/header), merged text windows around keyword hits in the page body,
+        and the body text itself (without the noise elements)
+    """
+    window = classification.ROI_WINDOW_CHARS if window is None else window
+    for el in soup.find_all(NOISE_TAGS):
+        el.decompose()
+
+    ctas = []
+    for el in soup.select(CTA_SELECTOR):
+        if el.find_parent(CHROME_TAGS):
+            continue
+        label = el.get_text(" ", strip=True) or el.get("value") or el.get("aria-label") or ""
+        if label and len(label) <= 200 and pattern.search(label.lower()):
+            ctas.append(label)
+
+    text = soup.get_text(" ", strip=True)
+    spans = []
+    for m in pattern.finditer(text.lower()):
+        start, end = max(0, m.start() - window), min(len(text), m.end() + window)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    windows = [text[start:end] for start, end in spans]
+    return ctas, windows, text
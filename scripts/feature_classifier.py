@@ -0,0 +1,302 @@
+# scripts/feature_classifier.py
+"""
+Feature-vector status classifier with calibrated confidence.
+
+Each page becomes a fixed-length vector (keyword-category counts in CTAs,
+keyword windows and body text, first-hit positions, page size and page
+language). A softmax model learned from labelled history scores a whole
+batch at once with NumPy; temperature scaling on a held-out split calibrates
+the confidences so MIN_CONFIDENCE means what it says, and predictions below
+it come back "unknown" (the crawler then keeps the rule-based result).
+Without a trained model (or without NumPy) the crawler keeps using the
+rule-based classify(). Accuracy is reported on a held-out test split of the
+labelled pages, never on the pages the model was trained on.
+
+Labelled history is JSONL, one page per line:
+    {"label": "open", "html": "<html>...", "country": "Spain"}
+    {"label": "sold_out", "sha256": "<snapshot digest>", "timezone": "Europe/London"}
+    {"label": "waitlist", "text": "Join the waiting list"}
+
+    python scripts/feature_classifier.py train --labels data/labels.jsonl
+    python scripts/feature_classifier.py evaluate --labels data/labels.jsonl
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+from config import classification, COUNTRY_LANGUAGE, TIMEZONE_MAP
+from logger import setup_logger
+from profiling import profiled_main
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+logger = setup_logger(__name__)
+
+CLASSES = ["unknown", "not_yet_open", "open", "waitlist", "sold_out"]
+CATEGORIES = ["open", "sold", "wait", "notyet"]
+LANGUAGES = ["en", "de", "fr", "es", "pt", "it", "nl", "nordic", "other"]
+
+TIMEZONE_LANGUAGE = {}
+for _country, _tz in TIMEZONE_MAP.items():
+    TIMEZONE_LANGUAGE.setdefault(_tz, COUNTRY_LANGUAGE.get(_country, "other"))
+
+
+def language_for(country: str | None = None, timezone: str | None = None) -> str:
+    """Page language guessed from the race country, or from its timezone when only that is known."""
+    if country:
+        return COUNTRY_LANGUAGE.get(country, "other")
+    return TIMEZONE_LANGUAGE.get(timezone or "", "other")
+
+
+def page_features(ctas: list, windows: list, body_text: str, language: str, category_res: dict) -> list:
+    """
+    Fixed-length feature vector for one page.
+
+    Args:
+        ctas, windows, body_text: page regions (see check_availability.page_regions)
+        language: one of LANGUAGES
+        category_res: compiled regex per keyword category (check_availability.CATEGORY_RE)
+
+    Returns:
+        list of floats, len == len(feature_names())
+    """
+    cta_text = " | ".join(ctas).lower()
+    window_text = " | ".join(windows).lower()
+    text = body_text.lower()
+    n = max(len(text), 1)
+    features = []
+    for cat in CATEGORIES:
+        pattern = category_res[cat]
+        first = pattern.search(text)
+        features += [
+            math.log1p(len(pattern.findall(cta_text))),
+            math.log1p(len(pattern.findall(window_text))),
+            math.log1p(len(pattern.findall(text))),
+            first.start() / n if first else 1.0,
+        ]
+    features += [math.log1p(len(text)) / 10, 1.0 if ctas else 0.0]
+    features += [1.0 if language == lang else 0.0 for lang in LANGUAGES]
+    return features
+
+
+def feature_names() -> list:
+    names = []
+    for cat in CATEGORIES:
+        names += [f"{cat}_cta_count", f"{cat}_window_count", f"{cat}_text_count", f"{cat}_first_pos"]
+    names += ["log_length", "has_cta"]
+    names += [f"lang_{lang}" for lang in LANGUAGES]
+    return names
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class FeatureClassifier:
+    """Softmax regression over page feature vectors, with temperature-scaled confidence."""
+
+    def __init__(self, weights, mean, scale, temperature: float = 1.0, classes: list = CLASSES):
+        self.weights = weights        # (n_features + 1, n_classes), last row is the bias
+        self.mean = mean
+        self.scale = scale
+        self.temperature = temperature
+        self.classes = list(classes)
+
+    @property
+    def version(self) -> str:
+        """Classifier version tag recorded on observations."""
+        return "model-" + hashlib.sha1(self.weights.tobytes()).hexdigest()[:8]
+
+    def _design(self, X):
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return np.hstack([X, np.ones((X.shape[0], 1))])
+
+    def predict_proba(self, X):
+        """Class probabilities for a batch, shape (n_pages, n_classes)."""
+        return _softmax(self._design(X) @ self.weights / self.temperature)
+
+    def predict(self, X, min_confidence: float | None = None) -> tuple:
+        """
+        Score a batch of pages.
+
+        Args:
+            X: feature vectors, one row per page
+            min_confidence: predictions less confident than this are returned
+                as "unknown" (default classification.MIN_CONFIDENCE; 0 keeps all)
+
+        Returns:
+            (statuses, confidences) lists, one entry per row of X
+        """
+        threshold = classification.MIN_CONFIDENCE if min_confidence is None else min_confidence
+        proba = self.predict_proba(X)
+        best = proba.argmax(axis=1)
+        confidences = [round(float(p), 3) for p in proba.max(axis=1)]
+        statuses = [self.classes[i] if conf >= threshold else "unknown" for i, conf in zip(best, confidences)]
+        return statuses, confidences
+
+    @classmethod
+    def fit(cls, X, labels: list, epochs: int = 500, lr: float = 0.5, l2: float = 1e-3,
+            val_fraction: float = 0.2, seed: int = 0) -> "FeatureClassifier":
+        """
+        Learn weights by full-batch gradient descent, then fit a temperature on a held-out split.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.array([CLASSES.index(label) for label in labels])
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(y))
+        n_val = int(len(y) * val_fraction) if len(y) >= 10 else 0
+        val, train = order[:n_val], order[n_val:]
+
+        mean = X[train].mean(axis=0)
+        scale = X[train].std(axis=0)
+        scale[scale == 0] = 1.0
+        model = cls(np.zeros((X.shape[1] + 1, len(CLASSES))), mean, scale)
+
+        A = model._design(X[train])
+        Y = np.eye(len(CLASSES))[y[train]]
+        for _ in range(epochs):
+            grad = A.T @ (_softmax(A @ model.weights) - Y) / len(train)
+            grad[:-1] += l2 * model.weights[:-1]
+            model.weights -= lr * grad
+
+        if n_val:
+            logits = model._design(X[val]) @ model.weights
+            best_t, best_nll = 1.0, float("inf")
+            for t in np.linspace(0.25, 5.0, 39):
+                p = _softmax(logits / t)[np.arange(n_val), y[val]]
+                nll = -np.log(np.clip(p, 1e-12, 1)).mean()
+                if nll < best_nll:
+                    best_t, best_nll = float(t), nll
+            model.temperature = best_t
+        return model
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, weights=self.weights, mean=self.mean, scale=self.scale,
+                 temperature=self.temperature, classes=np.array(self.classes))
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureClassifier":
+        data = np.load(path)
+        return cls(data["weights"], data["mean"], data["scale"],
+                   float(data["temperature"]), [str(c) for c in data["classes"]])
+
+
+def load_model(path: str | None = None) -> FeatureClassifier | None:
+    """Return the trained model, or None to fall back to the rule-based classifier."""
+    path = path or classification.MODEL_PATH
+    if not os.path.exists(path):
+        return None
+    if np is None:
+        logger.warning(f"Classifier model {path} found but NumPy is not installed; using rule-based classifier")
+        return None
+    model = FeatureClassifier.load(path)
+    logger.info(f"Using feature-vector classifier {model.version} from {path}")
+    return model
+
+
+def holdout_split(n: int, test_fraction: float, seed: int = 0) -> tuple:
+    """(train, test) index arrays: a fixed shuffled split, so train and evaluate agree on the test pages."""
+    order = np.random.default_rng(seed).permutation(n)
+    n_test = min(n, max(1, round(n * test_fraction))) if test_fraction > 0 else 0
+    return order[n_test:], order[:n_test]
+
+
+def reliability_table(confidences: list, correct: list, bins: int = 5) -> str:
+    """Confidence-bin vs observed-accuracy table (a calibrated model has them close)."""
+    lines = ["confidence   pages   accuracy"]
+    conf = np.asarray(confidences)
+    hit = np.asarray(correct, dtype=float)
+    edges = np.linspace(0, 1, bins + 1)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mask = (conf > lo) & (conf <= hi)
+        if mask.any():
+            lines.append(f"{lo:.1f}-{hi:.1f}   {int(mask.sum()):>7}   {hit[mask].mean():>8.2f}")
+    return "\n".join(lines)
+
+
+def load_labelled(path: str, snapshot_dir: str | None) -> tuple:
+    """Read labelled pages and turn them into (feature matrix, labels)."""
+    from bs4 import BeautifulSoup
+    from check_availability import page_regions, CATEGORY_RE
+    from snapshots import SnapshotStore
+
+    store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+    rows, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item.get("label") not in CLASSES:
+                continue
+            if "html" in item:
+                html = item["html"]
+            elif "sha256" in item and store:
+                html = store.get(item["sha256"]).decode("utf-8", errors="replace")
+            else:
+                html = item.get("text", "")
+            regions = page_regions(BeautifulSoup(html, "html.parser"))
+            language = language_for(item.get("country"), item.get("timezone"))
+            rows.append(page_features(*regions, language, CATEGORY_RE))
+            labels.append(item["label"])
+    return np.asarray(rows), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the feature-vector status classifier.")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--labels", required=True, help="JSONL file of labelled pages")
+    parser.add_argument("--snapshot-dir", help="snapshot store for entries given by sha256")
+    parser.add_argument("--model", default=classification.MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--test-fraction", type=float, default=0.2,
+                        help="labelled pages held out from training and used for accuracy "
+                             "(evaluate a separate labels file with 1.0)")
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("NumPy is required for the feature-vector classifier: pip install numpy")
+
+    X, labels = load_labelled(args.labels, args.snapshot_dir)
+    if not labels:
+        raise SystemExit(f"No usable labelled pages in {args.labels}")
+    logger.info(f"Loaded {len(labels)} labelled pages with {X.shape[1]} features")
+
+    train, test = holdout_split(len(labels), args.test_fraction)
+    if args.command == "train":
+        if not len(train):
+            raise SystemExit("--test-fraction leaves no pages to train on")
+        model = FeatureClassifier.fit(X[train], [labels[i] for i in train], epochs=args.epochs)
+        model.save(args.model)
+        logger.info(f"✅ Saved classifier {model.version} (temperature {model.temperature:.2f}) to {args.model}")
+    else:
+        model = FeatureClassifier.load(args.model)
+    if not len(test):
+        logger.warning("No held-out pages (--test-fraction 0); accuracy not reported")
+        return
+
+    statuses, confidences = model.predict(X[test], min_confidence=0)
+    truth = [labels[i] for i in test]
+    correct = [s == label for s, label in zip(statuses, truth)]
+    confident = [c >= classification.MIN_CONFIDENCE for c in confidences]
+    kept = [ok for ok, keep in zip(correct, confident) if keep]
+    print(f"\nHeld-out accuracy: {sum(correct) / len(correct):.3f} on {len(correct)} pages "
+          f"(trained on {len(labels) - len(correct)})")
+    if kept:
+        print(f"At MIN_CONFIDENCE {classification.MIN_CONFIDENCE}: {sum(kept) / len(kept):.3f} on the "
+              f"{len(kept)} pages ({len(kept) / len(correct):.0%}) the model decides; the rest fall back to the rules")
+    else:
+        print(f"No held-out page reaches MIN_CONFIDENCE {classification.MIN_CONFIDENCE}; all fall back to the rules")
+    print()
+    print(reliability_table(confidences, correct))
+
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -0,0 +1,134 @@
+# scripts/fetch.py
+"""
+Bounded streaming page fetcher.
+
+Registration pages are streamed instead of read whole: responses that aren't
+HTML (PDFs, images, downloads) are rejected from their headers, at most
+scraping.MAX_PAGE_BYTES are read, and reading stops as soon as the part of
+the page the extractor uses has arrived. The charset comes from the
+Content-Type header or a <meta> tag in the first few KB, never from sniffing
+the whole body. 429 and 503 responses raise Throttled instead of being
+classified, so the crawl policy can back off the host; any other non-2xx
+response raises FetchError (an error page says nothing about registration).
+"""
+import codecs
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from config import scraping
+
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+
+HEADER_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.I)
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+
+Page = namedtuple("Page", ["url", "status_code", "content", "text", "truncated"])
+
+
+class FetchError(Exception):
+    """The response can't be classified (e.g. it isn't an HTML page)."""
+
+
+class Throttled(FetchError):
+    """The host answered 429 Too Many Requests or 503 Service Unavailable."""
+
+    def __init__(self, status: int, retry_after: float | None = None):
+        super().__init__(f"Throttled ({status})" + (f", retry after {retry_after:.0f}s" if retry_after else ""))
+        self.status = status
+        self.retry_after = retry_after
+
+
+THROTTLE_STATUSES = {429, 503}
+
+
+_session = None
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.max_redirects = scraping.MAX_REDIRECTS
+    return _session
+
+
+def charset_for(content_type: str, head: bytes) -> str:
+    """Charset from the Content-Type header, else a <meta> tag, else UTF-8."""
+    m = HEADER_CHARSET_RE.search(content_type or "")
+    name = m.group(1) if m else None
+    if not name:
+        m = META_CHARSET_RE.search(head[:4096])
+        name = m.group(1).decode("ascii", errors="ignore") if m else None
+    try:
+        return codecs.lookup(name).name if name else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def fetch_html(url: str, headers: dict | None = None, max_bytes: int | None = None,
+               stop_at: re.Pattern | None = None) -> Page:
+    """
+    Stream an HTML page, reading no more than needed.
+
+    Args:
+        url: Page to fetch (redirects followed up to scraping.MAX_REDIRECTS)
+        headers: Request headers
+        max_bytes: Byte cap on the body (default scraping.MAX_PAGE_BYTES)
+        stop_at: Bytes regex; reading stops after the chunk where it first matches
+
+    Returns:
+        Page(url, status_code, content, text, truncated); `truncated` is True
+        when the byte cap cut the body short (with `stop_at`: before it matched)
+
+    Raises:
+        Throttled: 429/503 response
+        FetchError: any other non-2xx response, or a non-HTML content type
+        requests.RequestException: network errors, timeouts, redirect loops
+    """
+    max_bytes = scraping.MAX_PAGE_BYTES if max_bytes is None else max_bytes
+    with get_session().get(url, headers=headers, timeout=scraping.REQUEST_TIMEOUT, stream=True) as resp:
+        if resp.status_code in THROTTLE_STATUSES:
+            raise Throttled(resp.status_code, retry_after_seconds(resp.headers.get("Retry-After")))
+        if not 200 <= resp.status_code < 300:
+            raise FetchError(f"HTTP {resp.status_code}")
+        content_type = resp.headers.get("Content-Type", "")
+        mime = content_type.split(";")[0].strip().lower()
+        if mime and mime not in HTML_TYPES:
+            raise FetchError(f"Not an HTML page ({mime})")
+
+        chunks, size, truncated, tail = [], 0, False, b""
+        for chunk in resp.iter_content(chunk_size=scraping.CHUNK_BYTES):
+            chunks.append(chunk)
+            size += len(chunk)
+            # Keep a little of the previous chunk so a tag split across chunks still matches
+            m = stop_at.search(tail + chunk) if stop_at is not None else None
+            if m and size - len(chunk) - len(tail) + m.end() <= max_bytes:
+                break
+            if size >= max_bytes:
+                # Without stop_at only bytes beyond the cap count as cut off; with
+                # it, reaching the cap before it matched does
+                truncated = size > max_bytes or stop_at is not None
+                break
+            tail = chunk[-32:]
+        content = b"".join(chunks)[:max_bytes]
+
+    text = content.decode(charset_for(content_type, content), errors="replace")
+    return Page(resp.url, resp.status_code, content, text, truncated)
@@ -3,6 +3,8 @@
 Script to fix broken/missing URLs in seed_races.csv
 """
 import csv
+from name_match import NameIndex
+from profiling import profiled_main
 
 # Mapping of race names to their official URLs
 URL_FIXES = {
@@ -43,6 +45,7 @@ def fix_urls():
     output_file = "data/seed_races_fixed.csv"
 
     rows_updated = 0
+    fixes = NameIndex(URL_FIXES)
 
     with open(input_file, 'r', encoding='utf-8') as infile:
         reader = csv.DictReader(infile)
@@ -55,11 +58,13 @@ def fix_urls():
 
             # Check if link is broken (doesn't start with http)
             if not link.startswith('http'):
-                # Try to find a fix
-                if link in URL_FIXES:
-                    row['Link'] = URL_FIXES[link]
+                # Try to find a fix (the broken link is usually the race name)
+                match = fixes.best(link) or fixes.best(event)
+                if match:
+                    row['Link'] = match.value
                     rows_updated += 1
-                    print(f"✓ Fixed: {event} -> {URL_FIXES[link]}")
+                    via = "" if match.name in (link, event) else f" (matched '{match.name}', score {match.score})"
+                    print(f"✓ Fixed: {event} -> {match.value}{via}")
                 else:
                     print(f"⚠ Still broken: {event} ({link})")
 
@@ -77,4 +82,4 @@ def fix_urls():
     print(f"  mv {output_file} {input_file}")
 
 if __name__ == "__main__":
-    fix_urls()
+    profiled_main(fix_urls)
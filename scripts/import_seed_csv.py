@@ -1,50 +1,26 @@
 # scripts/import_seed_csv.py
 import os
 import csv
-import requests
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from slugify import slugify
 from logger import setup_logger
-from config import TIMEZONE_MAP, EU_COUNTRIES
+from config import TIMEZONE_MAP, EU_COUNTRIES, watch as watch_config
+from storage import get_backend, StorageError
+from profiling import profiled_main
 
 logger = setup_logger(__name__)
 logger.info("Starting import_seed_csv.py")
 
-# ---- Supabase config (from your Supabase project) ----
-try:
-    SB_URL = os.environ["SUPABASE_URL"].rstrip("/")
-    SB_KEY = os.environ["SUPABASE_SERVICE_KEY"]
-except KeyError as e:
-    logger.error(f"Missing environment variable: {e}")
-    raise SystemExit(f"Missing env var: {e}. Did you run 'export SUPABASE_URL=...' and 'export SUPABASE_SERVICE_KEY=...'?")
-
-# Important: Prefer header so PostgREST returns JSON on upsert
-HDRS = {
-    "apikey": SB_KEY,
-    "Authorization": f"Bearer {SB_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "return=representation,resolution=merge-duplicates"
-}
-
-SERIES_URL = f"{SB_URL}/rest/v1/race_series"
-EVENTS_URL = f"{SB_URL}/rest/v1/race_event"
-
-def upsert(url: str, rows: list, on_conflict: str | None = None):
-    """Upsert rows; tolerate empty/204 responses; return parsed JSON or []."""
+def upsert(table: str, rows: list, on_conflict: str | None = None):
+    """Upsert rows; tolerate empty/204 responses; return affected rows or []."""
     if not rows:
         return []
-    params = {"on_conflict": on_conflict} if on_conflict else {}
-    r = requests.post(url, headers=HDRS, json=rows, params=params, timeout=45)
-    if r.status_code >= 300:
-        logger.error(f"Supabase error {r.status_code}: {r.text}")
-        raise SystemExit(f"Supabase error {r.status_code}: {r.text}")
-    # Some responses are empty (201/204). Avoid json() crash.
-    if not (r.text or "").strip():
-        return []
     try:
-        return r.json()
-    except Exception:
-        logger.warning(f"Non-JSON response received: {r.status_code}, {(r.text or '')[:200]}")
-        return []
+        return get_backend().insert(table, rows, on_conflict=on_conflict, upsert=True)
+    except StorageError as e:
+        logger.error(f"Storage error {e.status}: {e.message}")
+        raise SystemExit(f"Storage error {e.status}: {e.message}")
 
 def parse_distance_km(dist_text: str | None):
     if not dist_text:
@@ -116,6 +92,32 @@ def parse_date_to_yyyy_mm_dd(date_str: str | None, country: str = ""):
     logger.warning(f"Could not parse date '{date_str}' for country '{country}'")
     return None
 
+def local_midnight(day: str | None, tz_name: str | None):
+    """
+    Midnight of a YYYY-MM-DD date in the race's timezone, as an ISO timestamp.
+
+    reg_opens_at is a TIMESTAMPTZ, and Postgres would store a bare date as UTC
+    midnight; the offset keeps the opening at the race's local midnight.
+
+    Args:
+        day: 'YYYY-MM-DD' date
+        tz_name: IANA timezone (watch.DEFAULT_TIMEZONE when missing or unknown)
+
+    Returns:
+        ISO 8601 timestamp with UTC offset, or None if `day` is not a valid date
+    """
+    if not day:
+        return None
+    try:
+        zone = ZoneInfo(tz_name or watch_config.DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo("UTC")
+    try:
+        return datetime.combine(date.fromisoformat(day), time(), tzinfo=zone).isoformat()
+    except ValueError:
+        logger.warning(f"Invalid date '{day}'")
+        return None
+
 def main():
     seed_path = "data/seed_races.csv"
     if not os.path.exists(seed_path):
@@ -169,28 +171,31 @@ def main():
                 # If date missing/unparsable, default to 2025; you can adjust later.
                 year = 2025
 
-            event_rows.append(
-                {
-                    "series_id": series_id,
-                    "year": year,
-                    "event_local_date": event_local_date,
-                    "event_timezone": tz,
-                    "reg_url": link,
-                    "general_access_status": "unknown",
-                }
-            )
+            event = {
+                "series_id": series_id,
+                "year": year,
+                "event_local_date": event_local_date,
+                "event_timezone": tz,
+                "reg_url": link,
+                "general_access_status": "unknown",
+            }
+            # Optional column: expected registration opening, used by the watch daemon
+            if "Reg Opens" in reader.fieldnames:
+                opens = (row.get("Reg Opens") or "").strip()
+                event["reg_opens_at"] = local_midnight(parse_date_to_yyyy_mm_dd(opens, country or ""), tz) if opens else None
+            event_rows.append(event)
 
     logger.info(f"Prepared {len(series_rows)} series rows and {len(event_rows)} event rows")
 
     # Bulk upserts (idempotent)
     logger.info("Upserting race series...")
-    s_res = upsert(SERIES_URL, series_rows, on_conflict="series_id")
+    s_res = upsert("race_series", series_rows, on_conflict="series_id")
     logger.info("Upserting race events...")
-    e_res = upsert(EVENTS_URL, event_rows, on_conflict="series_id,year")
+    e_res = upsert("race_event", event_rows, on_conflict="series_id,year")
 
     logger.info(f"✅ Upsert complete. race_series affected: {len(s_res) if s_res is not None else 0}, "
                 f"race_event affected: {len(e_res) if e_res is not None else 0}")
     logger.info("Import completed successfully")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiled_main(main)
\ No newline at end of file
@@ -0,0 +1,306 @@
+# scripts/loadtest.py
+"""
+Scale load test for the nightly pipeline.
+
+Generates a synthetic catalog of N events, serves their registration pages
+from a local site farm and their database from a mock PostgREST server
+(mock_postgrest.py), then runs the real stage scripts against both, one
+subprocess each, exactly as the nightly workflow does:
+
+    import_seed_csv -> check_availability -> resolve_latest -> analyze_database
+
+Race pages are spread over several site hosts (distinct loopback addresses),
+so per-host crawl delays overlap as they do across real registration sites.
+For every stage it reports wall time, events/s, database round-trips (by
+method), rows sent and received, responses truncated at the PostgREST row cap
+(an unpaginated read that silently loses data at scale) and peak RSS. A stage
+that exits non-zero or hits the row cap fails the run (exit status 1).
+
+    python scripts/loadtest.py --events 20000 --db-latency-ms 15 --site-latency-ms 50
+    python scripts/loadtest.py --events 5000 --site-hosts 100 --crawl-delay 1
+    python scripts/loadtest.py --events 5000 --history-days 365 --json report.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import TIMEZONE_MAP
+from logger import setup_logger
+from mock_postgrest import MockPostgrest
+from profiling import profiled_main
+
+logger = setup_logger(__name__)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ["import_seed_csv", "check_availability", "resolve_latest", "analyze_database"]
+
+SYLLABLES = ["ba", "ber", "lin", "do", "ka", "mo", "ri", "sa", "ten", "vo", "gra", "nes", "tor",
+             "pa", "lu", "me", "zi", "chi", "an", "os", "ul", "ke", "ta", "ro", "vi", "hel", "mar"]
+DISTANCES = ["Marathon", "Half Marathon", "10K", "5K"]
+
+# Page text per synthetic status (the farm serves page k with PAGE_STATUSES[k % len])
+PAGE_STATUSES = [
+    ("open", '<a class="btn" href="/enter">Register now</a><p>Entries are open for the 2026 race.</p>'),
+    ("sold_out", '<h2>Sold out</h2><p>All places for 2026 have been taken.</p>'),
+    ("waitlist", '<a href="/wait">Join the waitlist</a><p>The race is full.</p>'),
+    ("not_yet_open", '<h2>Registration opens soon</h2><p>Sign up for updates.</p>'),
+    ("unknown", '<p>Welcome to the race website.</p>'),
+]
+
+
+def place_name(i: int) -> str:
+    """Unique pronounceable place name for index i."""
+    parts = []
+    while True:
+        i, r = divmod(i, len(SYLLABLES))
+        parts.append(SYLLABLES[r])
+        if i == 0:
+            break
+        i -= 1
+    if len(parts) == 1:
+        parts.append("ton")
+    return "".join(parts).title()
+
+
+def generate_catalog(n_events: int, site_urls: list, shared_every: int = 10, seed: int = 0) -> list:
+    """
+    Synthetic seed_races.csv rows, with pages spread round-robin over `site_urls`.
+
+    Every `shared_every`-th event reuses the previous event's registration
+    page, like series whose races share one entry site.
+    """
+    rng = random.Random(seed)
+    countries = sorted(TIMEZONE_MAP)
+    rows = []
+    page = 0
+    for i in range(n_events):
+        if not (shared_every and i % shared_every == shared_every - 1):
+            page += 1
+        month, day = rng.randint(1, 12), rng.randint(13, 28)  # day > 12: unambiguous m/d vs d/m
+        rows.append({
+            "Event": f"{place_name(i)} {DISTANCES[i % len(DISTANCES)]}",
+            "City": place_name(i),
+            "Country": rng.choice(countries),
+            "Distance": DISTANCES[i % len(DISTANCES)],
+            "Date": f"{month}/{day}/2026",
+            "Link": f"{site_urls[page % len(site_urls)]}/race/{page}",
+        })
+    return rows
+
+
+def write_catalog(rows: list, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["Event", "City", "Country", "Distance", "Date", "Link"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class SiteFarm:
+    """Local HTTP servers impersonating race registration sites, one per host."""
+
+    def __init__(self, latency_ms: float = 0.0, page_kb: int = 20, hosts: int = 1):
+        self.latency = latency_ms / 1000
+        self.filler = "<p>" + "Race news and course information. " * 30 + "</p>"
+        self.page_kb = page_kb
+        self.hits = 0
+        self._lock = threading.Lock()
+        self.servers = [self._bind(i) for i in range(hosts)]
+
+    def _bind(self, i: int) -> ThreadingHTTPServer:
+        """A server on the i-th loopback address (127.0.0.1, .2, ...), or on its own port of 127.0.0.1 where only that is routed."""
+        try:
+            server = ThreadingHTTPServer((f"127.0.0.{i + 1}", 0), self._handler())
+        except OSError:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        server.daemon_threads = True
+        return server
+
+    @property
+    def urls(self) -> list:
+        return [f"http://{host}:{port}" for host, port in (s.server_address[:2] for s in self.servers)]
+
+    def start(self):
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def page(self, k: int) -> bytes:
+        _, body = PAGE_STATUSES[k % len(PAGE_STATUSES)]
+        filler = self.filler * max(1, self.page_kb * 1024 // len(self.filler))
+        return (f"<html><head><title>Race {k}</title></head><body><nav><a href='/'>Home</a></nav>"
+                f"<main>{body}{filler}</main><footer>Sold out merchandise</footer></body></html>").encode("utf-8")
+
+    def _handler(self):
+        farm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if farm.latency:
+                    time.sleep(farm.latency)
+                with farm._lock:
+                    farm.hits += 1
+                try:
+                    k = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+                except ValueError:
+                    self.send_error(404)
+                    return
+                data = farm.page(k)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+
+def seed_history(mock: MockPostgrest, days: int, seed: int = 0) -> int:
+    """Insert `days` of daily observations per event straight into the mock's database (not counted)."""
+    rng = random.Random(seed)
+    conn = mock.backend.conn
+    event_ids = [r[0] for r in conn.execute("SELECT event_id FROM race_event")]
+    statuses = [s for s, _ in PAGE_STATUSES]
+    now = datetime.now(timezone.utc)
+    total = 0
+    for day in range(days, 0, -1):
+        seen = (now - timedelta(days=day)).isoformat()
+        rows = [(eid, "official_site", "synthetic history", rng.choice(statuses), 0.8, None, seen, seen, seen, 1)
+                for eid in event_ids]
+        with conn:
+            conn.executemany(
+                "INSERT INTO status_observation (event_id, source, raw_excerpt, parsed_status, confidence, url, "
+                "observed_at, first_seen, last_seen, count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        total += len(rows)
+    return total
+
+
+def run_stage(stage: str, workdir: str, env: dict) -> dict:
+    """Run one stage script as a subprocess; return exit code, wall time and peak RSS."""
+    log_path = os.path.join(workdir, "logs", f"{stage}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, os.path.join(SCRIPTS_DIR, f"{stage}.py")],
+                                cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives this child's own resource usage (getrusage would mix all children)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        "exit_code": proc.returncode,
+        "seconds": round(time.perf_counter() - started, 2),
+        "max_rss_mib": round(usage.ru_maxrss / 1024, 1),  # KiB on Linux
+        "log": log_path,
+    }
+
+
+def stage_failed(result: dict) -> bool:
+    """A stage fails when it exits non-zero or any of its reads was truncated at the row cap."""
+    return bool(result["exit_code"] or sum(result["db"]["capped"].values()))
+
+
+def format_report(n_events: int, results: dict) -> str:
+    header = f"{'stage':<20}{'exit':>5}{'secs':>9}{'events/s':>10}{'requests':>10}{'GET':>7}{'POST':>7}" \
+             f"{'PATCH':>7}{'rows out':>10}{'rows in':>9}{'capped':>8}{'RSS MiB':>9}"
+    lines = [f"Load test: {n_events} events", "", header, "-" * len(header)]
+    for stage, r in results.items():
+        db = r["db"]
+        m = db["by_method"]
+        rate = n_events / r["seconds"] if r["seconds"] else 0
+        lines.append(f"{stage:<20}{r['exit_code']:>5}{r['seconds']:>9.2f}{rate:>10.1f}{db['requests']:>10}"
+                     f"{m.get('GET', 0):>7}{m.get('POST', 0):>7}{m.get('PATCH', 0):>7}{db['rows_out']:>10}"
+                     f"{db['rows_in']:>9}{sum(db['capped'].values()):>8}{r['max_rss_mib']:>9.1f}")
+    for stage, r in results.items():
+        for table, n in r["db"]["capped"].items():
+            lines.append(f"✗ {stage}: {n} read(s) of {table} hit the row cap — results were truncated")
+        if r["exit_code"]:
+            lines.append(f"✗ {stage} exited with {r['exit_code']} (see {r['log']})")
+    failed = [stage for stage, r in results.items() if stage_failed(r)]
+    lines += ["", f"FAILED: {', '.join(failed)}" if failed else "PASSED"]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline stages against synthetic data and mock services.")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of stages, in order")
+    parser.add_argument("--db-latency-ms", type=float, default=10.0, help="added to every database request")
+    parser.add_argument("--max-rows", type=int, default=1000, help="PostgREST rows-per-response cap (0 = none)")
+    parser.add_argument("--site-latency-ms", type=float, default=20.0, help="added to every page fetch")
+    parser.add_argument("--site-hosts", type=int, default=50, help="distinct site hosts the pages are spread over")
+    parser.add_argument("--crawl-delay", type=float, default=0.0,
+                        help="seconds between requests to one host (RACERADAR_SCRAPE_DELAY)")
+    parser.add_argument("--page-kb", type=int, default=20, help="approximate size of each race page")
+    parser.add_argument("--history-days", type=int, default=0, help="daily observations to pre-seed per event")
+    parser.add_argument("--workdir", help="keep the database, catalog and stage logs here")
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="raceradar-loadtest-")
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+    farm = SiteFarm(args.site_latency_ms, args.page_kb, max(1, args.site_hosts)).start()
+    mock = MockPostgrest(os.path.join(workdir, "loadtest.db"), latency_ms=args.db_latency_ms,
+                         max_rows=args.max_rows or None).start()
+    write_catalog(generate_catalog(args.events, farm.urls), os.path.join(workdir, "data", "seed_races.csv"))
+    logger.info(f"Load test in {workdir}: {args.events} events, database {mock.url}, "
+                f"{len(farm.urls)} site hosts ({farm.urls[0]}, ...)")
+
+    env = {k: v for k, v in os.environ.items() if not k.startswith("RACERADAR_")}
+    env.update({
+        "RACERADAR_BACKEND": "supabase",
+        "SUPABASE_URL": mock.url,
+        "SUPABASE_SERVICE_KEY": "loadtest",
+        "RACERADAR_SCRAPE_DELAY": str(args.crawl_delay),
+    })
+
+    results = {}
+    try:
+        for stage in stages:
+            if stage == "check_availability" and args.history_days:
+                n = seed_history(mock, args.history_days)
+                logger.info(f"Seeded {n} historical observations")
+            mock.stats.reset()
+            hits_before = farm.hits
+            logger.info(f"Running {stage}...")
+            result = run_stage(stage, workdir, env)
+            result["db"] = mock.stats.snapshot()
+            result["page_fetches"] = farm.hits - hits_before
+            results[stage] = result
+            if stage_failed(result):
+                logger.error(f"{stage} failed; stopping (log: {result['log']})")
+                break
+    finally:
+        farm.stop()
+        mock.stop()
+
+    print(format_report(args.events, results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"events": args.events, "workdir": workdir, "stages": results,
+                       "passed": not any(map(stage_failed, results.values()))}, f, indent=2)
+    if any(map(stage_failed, results.values())):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -0,0 +1,201 @@
+# scripts/mock_postgrest.py
+"""
+Local PostgREST stand-in for load tests.
+
+Serves /rest/v1/<table> over HTTP on top of a SqliteBackend, so the scripts
+run unchanged with RACERADAR_BACKEND=supabase and SUPABASE_URL pointing here.
+It implements the parts of PostgREST the pipeline relies on: filters, order,
+limit/offset, `Prefer: return=representation|minimal`,
+`Prefer: resolution=merge-duplicates` with `on_conflict`, and PATCH/DELETE
+with filters. Like Supabase it caps rows per response (`max_rows`), which is
+what exposes unpaginated reads at scale, and it can add per-request latency.
+Every request is counted so the load-test harness can report round-trips.
+
+    python scripts/mock_postgrest.py --db /tmp/loadtest.db --port 54321 --latency-ms 20
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from logger import setup_logger
+from storage import SqliteBackend, StorageError
+from profiling import profiled_main
+
+logger = setup_logger(__name__)
+
+
+class RequestStats:
+    """Thread-safe request, row and row-cap counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()     # (method, table) -> count
+            self.rows_out = 0
+            self.rows_in = 0
+            self.capped = Counter()       # table -> responses truncated at max_rows
+
+    def record(self, method: str, table: str, rows_in: int = 0, rows_out: int = 0, capped: bool = False):
+        with self._lock:
+            self.requests[(method, table)] += 1
+            self.rows_in += rows_in
+            self.rows_out += rows_out
+            if capped:
+                self.capped[table] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            by_method = Counter()
+            for (method, _), n in self.requests.items():
+                by_method[method] += n
+            return {
+                "requests": sum(self.requests.values()),
+                "by_method": dict(by_method),
+                "by_table": {f"{m} {t}": n for (m, t), n in sorted(self.requests.items())},
+                "rows_in": self.rows_in,
+                "rows_out": self.rows_out,
+                "capped": dict(self.capped),
+            }
+
+
+class MockPostgrest:
+    """HTTP server exposing a SqliteBackend through the PostgREST protocol."""
+
+    def __init__(self, db_path: str, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, max_rows: int | None = 1000):
+        self.backend = SqliteBackend(db_path)
+        self.latency = latency_ms / 1000
+        self.max_rows = max_rows
+        self.stats = RequestStats()
+        self._db_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, method: str, table: str, params: dict, body, prefer: set) -> tuple:
+        """
+        Apply one PostgREST request.
+
+        Returns:
+            (status, rows or None for an empty body)
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        representation = "return=representation" in prefer
+        with self._db_lock:
+            if method == "GET":
+                clamped = self.max_rows is not None and int(params.get("limit", self.max_rows + 1)) > self.max_rows
+                if clamped:
+                    params["limit"] = self.max_rows
+                rows = self.backend.select(table, params)
+                capped = clamped and len(rows) == self.max_rows
+                self.stats.record(method, table, rows_out=len(rows), capped=capped)
+                return 200, rows
+            if method == "POST":
+                rows = body if isinstance(body, list) else [body]
+                out = self.backend.insert(table, rows, on_conflict=params.get("on_conflict"),
+                                          upsert="resolution=merge-duplicates" in prefer,
+                                          returning=representation)
+                self.stats.record(method, table, rows_in=len(rows), rows_out=len(out))
+                return 201, out if representation else None
+            if method == "PATCH":
+                out = self.backend.update(table, body, params, returning=representation)
+                self.stats.record(method, table, rows_in=1, rows_out=len(out))
+                return (200, out) if representation else (204, None)
+            if method == "DELETE":
+                self.backend.delete(table, params)
+                self.stats.record(method, table)
+                return 204, None
+        return 405, {"message": f"Unsupported method {method}"}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self, method):
+                parts = urlsplit(self.path)
+                prefix = "/rest/v1/"
+                if not parts.path.startswith(prefix):
+                    self._send(404, {"message": "Not found"})
+                    return
+                table = parts.path[len(prefix):]
+                params = dict(parse_qsl(parts.query, keep_blank_values=True))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                prefer = {p.strip() for p in (self.headers.get("Prefer") or "").split(",") if p.strip()}
+                try:
+                    status, payload = mock.handle(method, table, params, body, prefer)
+                except StorageError as e:
+                    status, payload = e.status, {"message": e.message}
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {"message": str(e)}
+                self._send(status, payload)
+
+            def _send(self, status, payload):
+                data = json.dumps(payload, default=str).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                if data:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def log_message(self, fmt, *args):
+                logger.debug(fmt % args)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local SQLite database through a PostgREST-compatible API.")
+    parser.add_argument("--db", default="data/loadtest.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every request")
+    parser.add_argument("--max-rows", type=int, default=1000, help="rows per response cap (0 = none)")
+    args = parser.parse_args()
+
+    mock = MockPostgrest(args.db, args.host, args.port, args.latency_ms, args.max_rows or None)
+    logger.info(f"Mock PostgREST on {mock.url}/rest/v1 (SUPABASE_URL={mock.url})")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -0,0 +1,246 @@
+# scripts/name_match.py
+"""
+Fuzzy race-name matching.
+
+Race names come in many spellings: "LA Marathon" / "Los Angeles Marathon",
+"Napoli City Half Marathon" / "Napoli Half Marathon", sponsor prefixes,
+accents, years. NameIndex normalises names into tokens (accents folded,
+acronyms expanded, distance words unified, years dropped) and indexes their
+character trigrams, so a lookup only scores the few entries that share a rare token
+(or, for misspellings, rare trigrams) with the query instead of the whole
+catalog. Scores combine
+IDF-weighted token overlap with trigram similarity; names with different
+distances ("Berlin Marathon" / "Berlin Half Marathon") never match.
+
+    python scripts/name_match.py feed.csv --column name      # match a file against the seed catalog
+"""
+import argparse
+import csv
+import math
+import re
+import sys
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+from functools import lru_cache
+from config import matching as matching_config
+from profiling import profiled_main
+
+Match = namedtuple("Match", ["name", "value", "score"])
+
+# Expanded before lowercasing, so "LA" is Los Angeles but "La Rochelle" is not
+ACRONYMS = {"LA": "los angeles", "NYC": "new york city", "HM": "half marathon"}
+
+# Lowercased token -> normalised token(s)
+SYNONYMS = {
+    "st": "saint", "mt": "mount", "&": "and",
+    "10km": "10k", "5km": "5k",
+    "semi": "half", "medio": "half", "mezza": "half", "halbmarathon": "half marathon",
+    "halvmarathon": "half marathon", "halvmaraton": "half marathon", "halfmarathon": "half marathon",
+    "maraton": "marathon", "marato": "marathon", "maratona": "marathon", "marathone": "marathon",
+}
+STOPWORDS = {"the", "of", "and"}
+YEAR_RE = re.compile(r"^(19|20)\d\d$")
+TOKEN_RE = re.compile(r"[^\W_]+|&", re.UNICODE)
+APOSTROPHE_RE = re.compile(r"['\u2019]")
+
+DISTANCE_TOKENS = [("ultra", "ultra"), ("half", "half"), ("10k", "10k"), ("5k", "5k"), ("marathon", "marathon")]
+
+
+def normalize(name: str) -> tuple:
+    """Normalised tokens of a race name."""
+    tokens = []
+    for raw in TOKEN_RE.findall(APOSTROPHE_RE.sub("", name or "")):
+        if raw in ACRONYMS:
+            tokens += ACRONYMS[raw].split()
+            continue
+        token = unicodedata.normalize("NFKD", raw.lower())
+        token = "".join(c for c in token if not unicodedata.combining(c))
+        token = SYNONYMS.get(token, token)
+        tokens += [t for t in token.split() if t not in STOPWORDS and not YEAR_RE.match(t)]
+    return tuple(tokens)
+
+
+def distance_of(tokens: tuple) -> str | None:
+    """Distance class implied by the name ("half", "marathon", ...), if any."""
+    for token, distance in DISTANCE_TOKENS:
+        if token in tokens:
+            return distance
+    return None
+
+
+@lru_cache(maxsize=65536)
+def token_trigrams(token: str) -> frozenset:
+    padded = f" {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigrams(tokens) -> set:
+    grams = set()
+    for token in tokens:
+        grams |= token_trigrams(token)
+    return grams
+
+
+@lru_cache(maxsize=65536)
+def token_similarity(a: str, b: str) -> float:
+    """Trigram Dice similarity of two tokens."""
+    ga, gb = token_trigrams(a), token_trigrams(b)
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+
+class NameIndex:
+    """Trigram-indexed set of names for scored fuzzy lookup."""
+
+    def __init__(self, names=None):
+        """
+        Args:
+            names: iterable of names, or dict of name -> value returned with matches
+        """
+        self.names = []
+        self.values = []
+        self.tokens = []
+        self.grams = []
+        self.distances = []
+        self.postings = defaultdict(list)   # trigram -> entry ids
+        self.token_postings = defaultdict(list)
+        self.token_df = Counter()
+        self._idf_cache, self._idf_size = {}, 0
+        if names is not None:
+            items = names.items() if isinstance(names, dict) else ((n, n) for n in names)
+            for name, value in items:
+                self.add(name, value)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str, value=None):
+        """Index one name; `value` (default: the name) is returned with its matches."""
+        i = len(self.names)
+        tokens = normalize(name)
+        grams = trigrams(tokens)
+        self.names.append(name)
+        self.values.append(name if value is None else value)
+        self.tokens.append(tokens)
+        self.grams.append(grams)
+        self.distances.append(distance_of(tokens))
+        for gram in grams:
+            self.postings[gram].append(i)
+        for token in set(tokens):
+            self.token_postings[token].append(i)
+            self.token_df[token] += 1
+
+    def _idf(self, token: str) -> float:
+        if self._idf_size != len(self.names):
+            self._idf_cache, self._idf_size = {}, len(self.names)
+        idf = self._idf_cache.get(token)
+        if idf is None:
+            idf = self._idf_cache[token] = math.log((len(self.names) + 1) / (self.token_df.get(token, 0) + 1)) + 1
+        return idf
+
+    def _candidates(self, query_tokens: tuple, query_grams: set) -> list:
+        """
+        Entry ids worth scoring, most promising first.
+
+        Entries sharing a rare token come from the token postings; trigram
+        postings are only walked for tokens the index has never seen (typos,
+        spelling variants), using their rarest trigrams.
+        """
+        shared = Counter()
+        tokens = set(query_tokens)
+        for token in tokens:
+            if 0 < self.token_df[token] <= matching_config.MAX_POSTINGS:
+                shared.update(self.token_postings[token])
+        unseen = [t for t in tokens if t not in self.token_df]
+        if unseen or not shared:
+            grams = trigrams(unseen) if unseen else query_grams
+            known = sorted((g for g in grams if g in self.postings), key=lambda g: len(self.postings[g]))
+            for gram in known[:matching_config.SELECT_GRAMS]:
+                shared.update(self.postings[gram])
+        return [i for i, _ in shared.most_common(matching_config.CANDIDATES)]
+
+    def score(self, query_tokens: tuple, query_grams: set, i: int) -> float:
+        """Similarity in [0, 1] between a normalised query and entry `i`."""
+        tokens = self.tokens[i]
+        q_dist, c_dist = distance_of(query_tokens), self.distances[i]
+        if q_dist and c_dist and q_dist != c_dist:
+            return 0.0
+        q, c = set(query_tokens), set(tokens)
+        shared = sum(self._idf(t) for t in q & c)
+        # Misspelt tokens ("copenhagn") count for their closest unmatched counterpart
+        for token in q - c:
+            best_sim, best_token = 0.0, None
+            for other in c - q:
+                sim = token_similarity(token, other)
+                if sim > best_sim:
+                    best_sim, best_token = sim, other
+            if best_sim >= matching_config.TOKEN_SIMILARITY:
+                shared += best_sim * self._idf(best_token)
+        q_weight, c_weight = sum(self._idf(t) for t in q), sum(self._idf(t) for t in c)
+        if not q_weight or not c_weight:
+            return 0.0
+        # Containment forgives sponsor prefixes and suffixes; Dice keeps near-equal names on top
+        token_score = 0.6 * shared / min(q_weight, c_weight) + 0.4 * 2 * shared / (q_weight + c_weight)
+        grams = self.grams[i]
+        gram_score = 2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+        return round(0.7 * token_score + 0.3 * gram_score, 3)
+
+    def match(self, query: str, limit: int = 5, min_score: float = 0.0) -> list:
+        """
+        Best-scoring names for `query`.
+
+        Returns:
+            up to `limit` Match(name, value, score), best first
+        """
+        query_tokens = normalize(query)
+        query_grams = trigrams(query_tokens)
+        scored = []
+        for i in self._candidates(query_tokens, query_grams):
+            s = self.score(query_tokens, query_grams, i)
+            if s >= min_score:
+                scored.append(Match(self.names[i], self.values[i], s))
+        scored.sort(key=lambda m: -m.score)
+        return scored[:limit]
+
+    def best(self, query: str, min_score: float | None = None) -> Match | None:
+        """The single best match scoring at least `min_score` (default matching.MIN_SCORE), or None."""
+        min_score = matching_config.MIN_SCORE if min_score is None else min_score
+        matches = self.match(query, limit=1, min_score=min_score)
+        return matches[0] if matches else None
+
+    def match_many(self, queries, min_score: float | None = None) -> dict:
+        """Best match for every distinct query: {query: Match or None}."""
+        return {q: self.best(q, min_score) for q in dict.fromkeys(queries)}
+
+
+def catalog_index(seed_path: str = "data/seed_races.csv") -> NameIndex:
+    """NameIndex over the seed catalog's Event names (value: the CSV row)."""
+    with open(seed_path, newline="", encoding="utf-8") as f:
+        return NameIndex({row["Event"]: row for row in csv.DictReader(f) if row.get("Event")})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match race names against the seed catalog.")
+    parser.add_argument("input", help="CSV file (with --column) or text file with one name per line")
+    parser.add_argument("--column", help="CSV column holding the race name")
+    parser.add_argument("--seed", default="data/seed_races.csv")
+    parser.add_argument("--min-score", type=float, default=matching_config.MIN_SCORE)
+    args = parser.parse_args()
+
+    with open(args.input, newline="", encoding="utf-8") as f:
+        if args.column:
+            names = [row[args.column] for row in csv.DictReader(f) if row.get(args.column)]
+        else:
+            names = [line.strip() for line in f if line.strip()]
+
+    index = catalog_index(args.seed)
+    matches = index.match_many(names, args.min_score)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["name", "match", "score"])
+    for name, match in matches.items():
+        writer.writerow([name, match.name if match else "", match.score if match else ""])
+    matched = sum(1 for m in matches.values() if m)
+    print(f"{matched}/{len(matches)} names matched (min score {args.min_score})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    profiled_main(main)
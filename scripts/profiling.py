@@ -0,0 +1,171 @@
+# scripts/profiling.py
+"""
+Profiling hooks for pipeline entry points.
+
+Every script's entry point runs through profiled_main(), which understands
+
+    --profile                 profile the whole stage
+    --profile-mode cpu|mem|all   cProfile, tracemalloc or both (default: all)
+    --profile-dir DIR         where reports go (default: profiling.OUTPUT_DIR)
+
+and writes, per run, <stage>-<timestamp>.prof (open with snakeviz or
+pstats), <stage>-<timestamp>-cpu.txt (top functions by cumulative time) and
+<stage>-<timestamp>-alloc.txt (top allocation sites and peak memory).
+
+For production runs, RACERADAR_PROFILE_SAMPLE=0.05 makes check_availability
+profile only a deterministic ~5% sample of events (see EventSampler), so
+overhead stays low while slow pages still show up.
+"""
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from config import profiling as profiling_config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MODES = ["cpu", "mem", "all"]
+
+_active = False  # a whole-stage cProfile is running; samplers stand down
+
+
+def _report_base(out_dir: str, stage: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    return os.path.join(out_dir, f"{stage}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}")
+
+
+def write_cpu_report(profiler: cProfile.Profile, base: str, title: str) -> str:
+    """Dump `profiler` to <base>.prof and a top-N text summary to <base>-cpu.txt."""
+    profiler.dump_stats(base + ".prof")
+    out = io.StringIO()
+    out.write(title + "\n\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(profiling_config.TOP_N)
+    with open(base + "-cpu.txt", "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    return base + ".prof"
+
+
+def write_alloc_report(snapshot: tracemalloc.Snapshot, peak: int, base: str, title: str) -> str:
+    """Write the top-N allocation sites of `snapshot` to <base>-alloc.txt."""
+    lines = [title, f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB", ""]
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    for stat in snapshot.statistics("lineno")[:profiling_config.TOP_N]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:>10.1f} KiB  {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+    path = base + "-alloc.txt"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+@contextmanager
+def profile(stage: str, mode: str = "all", out_dir: str | None = None):
+    """
+    Profile the enclosed block and write reports when it exits (even on error).
+
+    Args:
+        stage: Report name prefix (usually the script name)
+        mode: "cpu" (cProfile), "mem" (tracemalloc) or "all"
+        out_dir: Report directory (default profiling.OUTPUT_DIR)
+    """
+    global _active
+    base = _report_base(out_dir or profiling_config.OUTPUT_DIR, stage)
+    profiler = cProfile.Profile() if mode in ("cpu", "all") else None
+    if mode in ("mem", "all"):
+        tracemalloc.start(profiling_config.TRACEMALLOC_FRAMES)
+    started = time.perf_counter()
+    if profiler:
+        _active = True
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            _active = False
+        title = f"{stage}: {time.perf_counter() - started:.1f}s wall time"
+        if profiler:
+            write_cpu_report(profiler, base, title)
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            write_alloc_report(snapshot, peak, base, title)
+        logger.info(f"Profile of {stage} written to {base}*")
+
+
+def profiled_main(main, stage: str | None = None):
+    """
+    Run an entry point, honouring --profile, --profile-mode and --profile-dir.
+
+    The profiling options are removed from sys.argv before `main` parses its own.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--profile-mode", choices=MODES, default="all")
+    parser.add_argument("--profile-dir")
+    args, rest = parser.parse_known_args(sys.argv[1:])
+    sys.argv = sys.argv[:1] + rest
+    if not args.profile:
+        return main()
+    stage = stage or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    with profile(stage, args.profile_mode, args.profile_dir):
+        return main()
+
+
+class EventSampler:
+    """
+    CPU-profiles a deterministic sample of events into one accumulated profile.
+
+    Sampling is by hash of the event key, so the same events are profiled on
+    every run and runs stay comparable. The rate comes from the
+    RACERADAR_PROFILE_SAMPLE environment variable (0 or unset = off).
+    """
+
+    def __init__(self, stage: str, rate: float | None = None, out_dir: str | None = None):
+        if rate is None:
+            rate = float(os.environ.get("RACERADAR_PROFILE_SAMPLE") or 0)
+        self.stage = stage
+        self.rate = min(max(rate, 0.0), 1.0)
+        self.out_dir = out_dir or profiling_config.OUTPUT_DIR
+        self.profiler = cProfile.Profile() if self.rate > 0 else None
+        self.sampled = 0
+        self.seconds = 0.0
+
+    def wants(self, key: str) -> bool:
+        return zlib.crc32(key.encode("utf-8")) % 10000 < self.rate * 10000
+
+    @contextmanager
+    def event(self, key: str):
+        """Profile the enclosed block if `key` is in the sample."""
+        if self.profiler is None or _active or not self.wants(key):
+            yield
+            return
+        started = time.perf_counter()
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+            self.sampled += 1
+            self.seconds += time.perf_counter() - started
+
+    def dump(self):
+        """Write the accumulated sample profile, if anything was sampled."""
+        if not self.sampled:
+            return
+        base = _report_base(self.out_dir, f"{self.stage}-events")
+        write_cpu_report(self.profiler, base, f"{self.stage}: {self.sampled} sampled events, "
+                                              f"{self.seconds:.1f}s ({self.seconds / self.sampled:.2f}s per event)")
+        logger.info(f"Profile of {self.sampled} sampled events written to {base}*")
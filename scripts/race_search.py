@@ -0,0 +1,260 @@
+# scripts/race_search.py
+"""
+In-memory indexed race search service.
+
+Loads the race_event / race_series join once into compact tuples with
+secondary indexes (country, distance, status) and a sorted date index, so
+filtered searches are set intersections and bisects instead of a PostgREST
+query per request. Repeated queries are served from an LRU cache. Refresh is
+cheap: status changes are applied from the status_change feed; only new
+events trigger a full reload.
+
+    python scripts/race_search.py serve --port 8080
+    curl 'localhost:8080/search?country=spain&distance=marathon&status=open&from=2026-03-01'
+    python scripts/race_search.py query --country uk --status open
+"""
+import argparse
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from slugify import slugify
+from changes import get_changes_since, settled_before
+from config import search as search_config
+from export_views import distance_slug
+from logger import setup_logger
+from storage import get_backend
+from profiling import profiled_main
+
+logger = setup_logger(__name__)
+
+Race = namedtuple("Race", [
+    "event_id", "series_id", "name", "city", "country", "distance_km",
+    "year", "event_local_date", "reg_url", "status", "confidence",
+])
+
+
+class RaceCatalog:
+    """Joined race catalog with secondary indexes and a cached search."""
+
+    def __init__(self, cache_size: int = search_config.CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.races = []
+        self.by_id = {}
+        self.by_country = defaultdict(set)
+        self.by_distance = defaultdict(set)
+        self.by_status = defaultdict(set)
+        self.dates = []          # sorted (event_local_date, row) for dated events
+        self.cursor = 0          # last status_change applied
+        self.loaded_at = 0.0
+        # LRU of search key -> results, read, filled and cleared only under _lock so
+        # a search computed before a refresh can't be stored after it
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    # ---- loading ----
+
+    def load(self):
+        """(Re)load the full catalog from storage and rebuild every index."""
+        db = get_backend()
+        # Start the cursor at the newest settled change: later ones are replayed by
+        # refresh(), which only re-sets statuses this load may already hold
+        latest_change = db.select("status_change", {
+            "select": "change_id", "changed_at": f"lt.{settled_before().isoformat()}",
+            "order": "change_id.desc", "limit": 1})
+        series = {s["series_id"]: s for page in db.select_pages("race_series", {
+            "select": "series_id,name,city,country,distance_km", "order": "series_id"}) for s in page}
+        events = (ev for page in db.select_pages("race_event", {
+            "select": "event_id,series_id,year,event_local_date,reg_url,general_access_status,status_confidence",
+            "order": "event_id"}) for ev in page)
+
+        races = []
+        for ev in events:
+            s = series.get(ev["series_id"], {})
+            races.append(Race(
+                ev["event_id"], ev["series_id"], s.get("name"), s.get("city"), s.get("country"),
+                s.get("distance_km"), ev.get("year"), ev.get("event_local_date"), ev.get("reg_url"),
+                ev.get("general_access_status") or "unknown", ev.get("status_confidence"),
+            ))
+
+        by_country, by_distance, by_status = defaultdict(set), defaultdict(set), defaultdict(set)
+        for i, race in enumerate(races):
+            by_country[slugify(race.country or "unknown")].add(i)
+            by_distance[distance_slug(race.distance_km)].add(i)
+            by_status[race.status].add(i)
+        dates = sorted((race.event_local_date, i) for i, race in enumerate(races) if race.event_local_date)
+
+        with self._lock:
+            self.races = races
+            self.by_id = {race.event_id: i for i, race in enumerate(races)}
+            self.by_country, self.by_distance, self.by_status = by_country, by_distance, by_status
+            self.dates = dates
+            self.cursor = latest_change[0]["change_id"] if latest_change else 0
+            self.loaded_at = time.monotonic()
+            self._cache.clear()
+        logger.info(f"Loaded {len(races)} races into the search index")
+
+    def refresh(self) -> int:
+        """
+        Apply status changes recorded since the last load/refresh.
+
+        Returns:
+            number of changes applied (a full reload counts as all races)
+        """
+        changes, cursor = get_changes_since(self.cursor, limit=10000)
+        if not changes:
+            return 0
+        if any(c["event_id"] not in self.by_id for c in changes):
+            self.load()  # new events: rebuild rather than patch
+            return len(self.races)
+        with self._lock:
+            for c in changes:
+                i = self.by_id[c["event_id"]]
+                old = self.races[i]
+                self.by_status[old.status].discard(i)
+                self.by_status[c["new_status"]].add(i)
+                self.races[i] = old._replace(status=c["new_status"], confidence=c.get("confidence"))
+            self.cursor = cursor
+            self._cache.clear()
+        return len(changes)
+
+    def refresh_if_stale(self, max_age: float = search_config.REFRESH_SECONDS):
+        """Refresh from the change feed if the last refresh is older than `max_age` seconds."""
+        if time.monotonic() - self.loaded_at <= max_age:
+            return
+        with self._refresh_lock:
+            if time.monotonic() - self.loaded_at > max_age:
+                self.refresh()
+                self.loaded_at = time.monotonic()
+
+    # ---- querying ----
+
+    def search(self, country: str | None = None, distance: str | None = None, status: str | None = None,
+               date_from: str | None = None, date_to: str | None = None, limit: int | None = None) -> list:
+        """
+        Races matching every given filter, ordered by date (undated last).
+
+        Args:
+            country: country name or slug (e.g. "United Kingdom", "uk")
+            distance: marathon, half-marathon, 10k, 5k, other or unknown
+            status: general_access_status
+            date_from, date_to: inclusive YYYY-MM-DD window on event_local_date
+            limit: maximum races to return
+        """
+        key = (slugify(country) if country else None, distance, status, date_from, date_to, limit)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            results = self._search_uncached(*key)
+            self._cache[key] = results
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return results
+
+    def _search_uncached(self, country, distance, status, date_from, date_to, limit) -> list:
+        """Evaluate a search against the indexes; the caller holds _lock."""
+        candidates = []
+        if country:
+            candidates.append(self.by_country.get(country, set()))
+        if distance:
+            candidates.append(self.by_distance.get(distance, set()))
+        if status:
+            candidates.append(self.by_status.get(status, set()))
+
+        if date_from or date_to:
+            lo = bisect.bisect_left(self.dates, (date_from,)) if date_from else 0
+            hi = bisect.bisect_right(self.dates, (date_to, len(self.races))) if date_to else len(self.dates)
+            ordered = [i for _, i in self.dates[lo:hi]]
+            if candidates:
+                keep = set.intersection(*sorted(candidates, key=len))
+                ordered = [i for i in ordered if i in keep]
+        else:
+            keep = set.intersection(*sorted(candidates, key=len)) if candidates else range(len(self.races))
+            ordered = sorted(keep, key=lambda i: (self.races[i].event_local_date is None,
+                                                  self.races[i].event_local_date or ""))
+        if limit is not None:
+            ordered = ordered[:limit]
+        return [self.races[i]._asdict() for i in ordered]
+
+
+def parse_limit(value: str | None) -> int:
+    """
+    The `limit` query param, clamped to search.MAX_LIMIT (the default when missing).
+
+    Raises:
+        ValueError: not a non-negative integer
+    """
+    if not value:
+        return search_config.MAX_LIMIT
+    limit = int(value)
+    if limit < 0:
+        raise ValueError(value)
+    return min(limit, search_config.MAX_LIMIT)
+
+
+def make_handler(catalog: RaceCatalog):
+    class SearchHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path != "/search":
+                self.send_error(404)
+                return
+            q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            try:
+                limit = parse_limit(q.get("limit"))
+            except ValueError:
+                self.send_error(400, "limit must be a non-negative integer")
+                return
+            catalog.refresh_if_stale()
+            results = catalog.search(
+                country=q.get("country"), distance=q.get("distance"), status=q.get("status"),
+                date_from=q.get("from"), date_to=q.get("to"), limit=limit,
+            )
+            body = json.dumps(results, default=str).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+
+    return SearchHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory race search over the catalog.")
+    parser.add_argument("command", choices=["serve", "query"])
+    parser.add_argument("--host", default=search_config.HOST)
+    parser.add_argument("--port", type=int, default=search_config.PORT)
+    parser.add_argument("--country")
+    parser.add_argument("--distance")
+    parser.add_argument("--status")
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    catalog = RaceCatalog()
+    catalog.load()
+    if args.command == "query":
+        for race in catalog.search(args.country, args.distance, args.status, args.date_from, args.date_to, args.limit):
+            print(json.dumps(race, default=str))
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(catalog))
+    logger.info(f"Serving race search on http://{args.host}:{args.port}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -0,0 +1,171 @@
+# scripts/reclassify.py
+"""
+Re-run the classifier over stored observations or page snapshots.
+
+Lets a change to KEYS or classify() be evaluated (and backfilled) against
+history without waiting for the next crawl:
+
+    python scripts/reclassify.py --source observations
+    python scripts/reclassify.py --source snapshots --workers 8
+
+Classification runs across a ProcessPoolExecutor and a before/after
+confusion matrix is printed. Only snapshot results are written back
+(parsed_status / confidence in bulk, tagged with CLASSIFIER_VERSION): stored
+excerpts are truncated, so a verdict on one is not a verdict on the page.
+"""
+import argparse
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+from check_availability import classify, classify_page, CLASSIFIER_VERSION
+from logger import setup_logger
+from snapshots import SnapshotStore, get_snapshot_store
+from storage import get_backend
+from profiling import profiled_main
+
+logger = setup_logger(__name__)
+
+STATUSES = ["unknown", "not_yet_open", "open", "waitlist", "sold_out", "closed"]
+
+# Worker-process state (set by _init_worker)
+_store = None
+
+
+def _init_worker(snapshot_root: str | None):
+    global _store
+    _store = SnapshotStore(snapshot_root) if snapshot_root else None
+
+
+def _classify_text(text: str | None) -> tuple:
+    return classify(text or "")
+
+
+def _classify_snapshot(digest: str) -> tuple:
+    html = _store.get(digest).decode("utf-8", errors="replace")
+    status, conf, _ = classify_page(BeautifulSoup(html, "html.parser"))
+    return status, conf
+
+
+def load_observation_items() -> list:
+    """Observations that still carry an excerpt, as (row, classifier input) pairs."""
+    items = []
+    for page in get_backend().select_pages("status_observation", {
+        "select": "observation_id,event_id,source,parsed_status,confidence,raw_excerpt",
+        "raw_excerpt": "not.is.null",
+        "order": "observation_id.asc",
+    }):
+        items.extend((row, row["raw_excerpt"]) for row in page)
+    return items
+
+
+def load_snapshot_items(store: SnapshotStore) -> list:
+    """
+    The most recent snapshot behind each observation run, as (row, digest) pairs.
+
+    Snapshot index entries written by the crawler carry the observation_id
+    they were recorded under; entries without one are compared but not written.
+    """
+    latest = {}
+    for event_id in store.event_ids():
+        for entry in store.history(event_id):
+            key = entry.get("observation_id") or (event_id, entry["seen_at"])
+            latest[key] = {
+                "observation_id": entry.get("observation_id"),
+                "event_id": event_id,
+                "parsed_status": entry.get("status"),
+                "confidence": entry.get("confidence"),
+                "sha256": entry["sha256"],
+            }
+    return [(row, row["sha256"]) for row in latest.values()]
+
+
+def confusion_matrix(pairs: list) -> str:
+    """Render a before (rows) x after (columns) status table."""
+    counts = Counter(pairs)
+    labels = [s for s in STATUSES if any(s in p for p in counts)]
+    labels += sorted({s for p in counts for s in p} - set(labels), key=str)
+    width = max([len(str(label)) for label in labels] + [12])
+    lines = [" " * width + " | " + " ".join(f"{str(label):>{width}}" for label in labels)]
+    lines.append("-" * len(lines[0]))
+    for before in labels:
+        row = " ".join(f"{counts.get((before, after), 0):>{width}}" for after in labels)
+        lines.append(f"{str(before):>{width}} | {row}")
+    return "\n".join(lines)
+
+
+def write_revisions(revised: list, batch_size: int):
+    """Bulk-upsert revised classifications on observation_id."""
+    db = get_backend()
+    for i in range(0, len(revised), batch_size):
+        db.insert("status_observation", revised[i:i + batch_size],
+                  on_conflict="observation_id", upsert=True, returning=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run the classifier over stored observations or snapshots.")
+    parser.add_argument("--source", choices=["observations", "snapshots"], default="observations")
+    parser.add_argument("--snapshot-dir", help="snapshot store root (default: configured store)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=256, help="items handed to a worker at a time")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per bulk write")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report the confusion matrix without writing (always the case for observations)")
+    args = parser.parse_args()
+
+    snapshot_root = None
+    if args.source == "snapshots":
+        store = SnapshotStore(args.snapshot_dir) if args.snapshot_dir else get_snapshot_store()
+        if store is None:
+            raise SystemExit("No snapshot store configured. Pass --snapshot-dir or set RACERADAR_SNAPSHOT_DIR.")
+        snapshot_root = store.root
+        items = load_snapshot_items(store)
+        func = _classify_snapshot
+    else:
+        items = load_observation_items()
+        func = _classify_text
+    logger.info(f"Reclassifying {len(items)} {args.source} with classifier {CLASSIFIER_VERSION} "
+                f"on {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(snapshot_root,)) as pool:
+        results = list(pool.map(func, (payload for _, payload in items), chunksize=args.chunksize))
+
+    pairs, revised = [], []
+    for (row, _), (status, conf) in zip(items, results):
+        pairs.append((row.get("parsed_status") or "unknown", status))
+        if row.get("observation_id"):
+            revised.append({
+                "observation_id": row["observation_id"],
+                "event_id": row["event_id"],
+                "source": row.get("source") or "official_site",
+                "parsed_status": status,
+                "confidence": conf,
+                "classifier_version": CLASSIFIER_VERSION,
+            })
+
+    changed = sum(1 for before, after in pairs if before != after)
+    print(f"\nBefore (rows) vs after (columns), classifier {CLASSIFIER_VERSION}:\n")
+    print(confusion_matrix(pairs))
+    print(f"\n{changed}/{len(pairs)} classifications changed\n")
+
+    if args.dry_run:
+        logger.info("Dry run, no changes written")
+        return
+    if args.source == "observations":
+        logger.info("Excerpts are truncated page text; reclassify --source snapshots to write revisions")
+        return
+    # Snapshots can outlive the observation rows they were recorded under (compaction)
+    existing = {
+        row["observation_id"]
+        for page in get_backend().select_pages("status_observation", {
+            "select": "observation_id", "order": "observation_id.asc"})
+        for row in page
+    }
+    revised = [row for row in revised if row["observation_id"] in existing]
+    write_revisions(revised, args.batch_size)
+    logger.info(f"✅ Wrote {len(revised)} revised observations")
+
+
+if __name__ == "__main__":
+    profiled_main(main)
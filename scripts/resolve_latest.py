@@ -1,72 +1,115 @@
 # scripts/resolve_latest.py
-import os
-import requests
+import argparse
+from itertools import islice
 from datetime import datetime, timezone
+from config import database
 from logger import setup_logger
+from storage import get_backend, StorageError
+from changes import record_changes
+from checkpoint import crawl_in_progress
+from profiling import profiled_main
+from roster import current_statuses_from_pages, latest_statuses_from_pages, intern_status, uuid_bytes, uuid_str
 
 logger = setup_logger(__name__)
 
-SB_URL = os.environ["SUPABASE_URL"].rstrip("/")
-SB_KEY = os.environ["SUPABASE_SERVICE_KEY"]
-HDRS  = {
-    "apikey": SB_KEY,
-    "Authorization": f"Bearer {SB_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "resolution=merge-duplicates"
-}
-
-def get_latest_observations():
+def get_latest_observations(event_ids: list | None = None):
+    """Latest status (roster.LatestStatus) of every observed event (or just `event_ids`), keyed by event_id bytes."""
     logger.info("Fetching latest observations from database...")
-    r = requests.get(
-        f"{SB_URL}/rest/v1/status_observation"
-        "?select=event_id,parsed_status,confidence,observed_at"
-        "&order=observed_at.desc",
-        headers=HDRS, timeout=60
-    )
-    r.raise_for_status()
-    latest_by_event = {}
-    for row in r.json():
-        eid = row["event_id"]
-        if eid not in latest_by_event:
-            latest_by_event[eid] = {
-                "status": row.get("parsed_status") or "unknown",
-                "conf": row.get("confidence", 0.5)
-            }
+    params = {"select": "event_id,parsed_status,confidence,last_seen", "order": "event_id,last_seen.desc"}
+    if event_ids is not None:
+        params["event_id"] = f"in.({','.join(event_ids)})"
+    latest_by_event = latest_statuses_from_pages(get_backend().select_pages("latest_observation", params))
     logger.info(f"Found latest observations for {len(latest_by_event)} events")
     return latest_by_event
 
+def get_current_statuses(event_ids: list | None = None):
+    """
+    Last published status of every event (or just `event_ids`), keyed by event_id bytes.
+
+    That is the new_status of the event's latest status_change, falling back
+    to race_event.general_access_status for events without one. The column
+    alone can't be trusted: import_seed_csv resets it to "unknown" every night.
+    """
+    db = get_backend()
+    params = {"select": "event_id,general_access_status", "order": "event_id"}
+    if event_ids is not None:
+        params["event_id"] = f"in.({','.join(event_ids)})"
+    current = current_statuses_from_pages(db.select_pages("race_event", params))
+    params = {**params, "select": "event_id,new_status"}
+    for page in db.select_pages("latest_status_change", params):
+        for row in page:
+            current[uuid_bytes(row["event_id"])] = intern_status(row["new_status"])
+    return current
+
 def patch_event(event_id, status, conf):
     # Generate ISO 8601 timestamp for last_checked_at
     now_timestamp = datetime.now(timezone.utc).isoformat()
 
-    r = requests.patch(
-        f"{SB_URL}/rest/v1/race_event?event_id=eq.{event_id}",
-        headers=HDRS,
-        json={
-            "general_access_status": status,
-            "status_confidence": conf,
-            "last_checked_at": now_timestamp,
-            "status_source": "official_site",
-        },
-        timeout=45
-    )
-    if r.status_code >= 300:
-        logger.error(f"Failed to patch event {event_id}: {r.status_code} {r.text}")
+    try:
+        get_backend().update(
+            "race_event",
+            {
+                "general_access_status": status,
+                "status_confidence": conf,
+                "last_checked_at": now_timestamp,
+                "status_source": "official_site",
+            },
+            {"event_id": f"eq.{event_id}"}
+        )
+    except StorageError as e:
+        logger.error(f"Failed to patch event {event_id}: {e.status} {e.message}")
         return False
     logger.debug(f"Updated event {event_id} to status '{status}' (confidence: {conf:.2f})")
     return True
 
-def main():
-    logger.info("Starting resolver to update event statuses...")
-    winners = get_latest_observations()
+def resolve(event_ids: list | None = None) -> tuple:
+    """
+    Update race_event statuses from their latest observations and record transitions.
+
+    Args:
+        event_ids: restrict to these events (default: every observed event)
+
+    Returns:
+        (updated, changes, failed) counts
+
+    Raises:
+        StorageError: a batch of status changes couldn't be recorded. That
+        batch's events are left unpatched, so a rerun finds the same changes.
+    """
+    winners = get_latest_observations(event_ids)
+    current = get_current_statuses(event_ids)
     updated = 0
     failed = 0
-    for eid, v in winners.items():
-        if patch_event(eid, v["status"], v["conf"]):
-            updated += 1
-        else:
-            failed += 1
-    logger.info(f"✅ Resolver complete. Updated {updated} events, {failed} failures")
+    changed = 0
+    items = iter(winners.items())
+    while batch := list(islice(items, database.BATCH_SIZE)):
+        # Transitions are written before their events are patched: a patch that
+        # fails afterwards is retried next run without recording the change twice
+        changed += record_changes([
+            {"event_id": uuid_str(eid), "old_status": current.get(eid), "new_status": v.status, "confidence": v.conf}
+            for eid, v in batch if current.get(eid) != v.status
+        ])
+        for eid, v in batch:
+            if patch_event(uuid_str(eid), v.status, v.conf):
+                updated += 1
+            else:
+                failed += 1
+    return updated, changed, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Update event statuses from their latest observations.")
+    parser.add_argument("--force", action="store_true", help="resolve even though a crawl is unfinished")
+    args = parser.parse_args()
+
+    if crawl_in_progress() and not args.force:
+        raise SystemExit("check_availability has not completed (checkpoint present); "
+                         "finish it with --resume or pass --force")
+    logger.info("Starting resolver to update event statuses...")
+    try:
+        updated, changed, failed = resolve()
+    except StorageError as e:
+        raise SystemExit(f"Failed to record status changes: {e.status} {e.message}")
+    logger.info(f"✅ Resolver complete. Updated {updated} events ({changed} status changes), {failed} failures")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
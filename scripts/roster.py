@@ -0,0 +1,131 @@
+# scripts/roster.py
+"""
+Compact in-process records for large crawls.
+
+check_availability and resolve_latest hold one record per event for a whole
+run. As JSON-decoded dicts every record carries its own key strings, a
+36-character UUID string and its own copy of each status string, which adds
+up to gigabytes at a few hundred thousand events. The records here are
+`__slots__` dataclasses with UUIDs stored as 16 bytes and statuses, sources,
+timezones and URLs interned (one shared copy per distinct value; an event's
+reg_url and its observation url become the same object). They are built page
+by page (StorageBackend.select_pages), so the decoded rows of a full table
+never exist at once.
+"""
+import sys
+import uuid
+from dataclasses import dataclass
+from compact_observations import run_key
+
+STATUSES = ("unknown", "not_yet_open", "open", "waitlist", "sold_out", "closed")
+_STATUSES = {s: sys.intern(s) for s in STATUSES}
+
+
+def intern_status(value: str | None) -> str:
+    """The shared copy of a status string (None means "unknown")."""
+    value = value or "unknown"
+    return _STATUSES.get(value) or sys.intern(value)
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value else value
+
+
+def uuid_bytes(value: str) -> bytes | str:
+    """16-byte form of a UUID; ids that aren't UUIDs are kept as they are."""
+    try:
+        return uuid.UUID(value).bytes
+    except ValueError:
+        return value
+
+
+def uuid_str(value: bytes | str) -> str:
+    """Inverse of uuid_bytes()."""
+    return value if isinstance(value, str) else str(uuid.UUID(bytes=value))
+
+
+@dataclass(slots=True)
+class Event:
+    """A race_event row to check (check_availability.EVENTS_QUERY columns)."""
+    event_id: bytes | str
+    series_id: str
+    year: int | None
+    reg_url: str
+    event_timezone: str | None = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Event":
+        return cls(uuid_bytes(row["event_id"]), _intern(row.get("series_id")), row.get("year"),
+                   _intern(row.get("reg_url")), _intern(row.get("event_timezone")))
+
+    @property
+    def id(self) -> str:
+        return uuid_str(self.event_id)
+
+    def to_row(self) -> dict:
+        return {"event_id": self.id, "series_id": self.series_id, "year": self.year,
+                "reg_url": self.reg_url, "event_timezone": self.event_timezone}
+
+
+@dataclass(slots=True)
+class LatestRun:
+    """An event's current observation run, as check_availability.post_obs needs it."""
+    observation_id: bytes | str
+    source: str
+    parsed_status: str
+    confidence: float | None
+    url: str | None
+    count: int
+
+    @classmethod
+    def from_row(cls, row: dict) -> "LatestRun":
+        conf = row.get("confidence")
+        return cls(uuid_bytes(row["observation_id"]), _intern(row.get("source")),
+                   intern_status(row.get("parsed_status")), None if conf is None else float(conf),
+                   _intern(row.get("url")), row.get("count") or 1)
+
+    def run_key(self) -> tuple:
+        """compact_observations.run_key() of this run."""
+        return run_key(self.source, self.url, self.parsed_status)
+
+
+@dataclass(slots=True)
+class LatestStatus:
+    """The status an event's latest observation reports (resolve_latest)."""
+    status: str
+    conf: float
+
+
+def events_from_pages(pages) -> list:
+    """Event records from pages of race_event rows."""
+    return [Event.from_row(row) for page in pages for row in page]
+
+
+def latest_runs_from_pages(pages) -> dict:
+    """event_id bytes -> LatestRun from pages of latest_observation rows."""
+    return {uuid_bytes(row["event_id"]): LatestRun.from_row(row) for page in pages for row in page}
+
+
+def current_statuses_from_pages(pages) -> dict:
+    """event_id bytes -> general_access_status (interned; None when unset) from pages of race_event rows."""
+    return {
+        uuid_bytes(row["event_id"]): intern_status(row["general_access_status"]) if row.get("general_access_status") else None
+        for page in pages for row in page
+    }
+
+
+def latest_statuses_from_pages(pages) -> dict:
+    """
+    event_id bytes -> LatestStatus from pages of observation rows.
+
+    Rows must come newest first within each event; the first row of an event wins.
+    """
+    latest = {}
+    for page in pages:
+        for row in page:
+            eid = uuid_bytes(row["event_id"])
+            if eid not in latest:
+                conf = row.get("confidence")
+                latest[eid] = LatestStatus(intern_status(row.get("parsed_status")),
+                                           0.5 if conf is None else float(conf))
+    return latest
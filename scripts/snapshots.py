@@ -0,0 +1,151 @@
+# scripts/snapshots.py
+"""
+Content-addressed store for fetched registration pages.
+
+Pages are stored compressed (zstd if the `zstandard` package is installed,
+gzip otherwise) under their SHA-256, sharded two levels deep:
+
+    <root>/objects/ab/cd/abcd...ef.zst
+
+so an unchanged page costs no extra storage however many times it is seen.
+A per-event index (<root>/index/<event_id>.jsonl) records which snapshot was
+seen when, giving a durable corpus for re-classification and debugging
+without re-crawling.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from config import snapshots as snapshot_config
+from logger import setup_logger
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = setup_logger(__name__)
+
+CODECS = {
+    ".zst": (
+        lambda data: zstandard.ZstdCompressor(level=snapshot_config.ZSTD_LEVEL).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    ),
+    ".gz": (
+        lambda data: gzip.compress(data, compresslevel=snapshot_config.GZIP_LEVEL),
+        gzip.decompress,
+    ),
+}
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SnapshotStore:
+    """Deduplicating, compressed, sharded page store with a per-event index."""
+
+    def __init__(self, root: str, compression: str | None = None):
+        self.root = root
+        compression = compression or snapshot_config.COMPRESSION
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed; falling back to gzip for page snapshots")
+            compression = "gzip"
+        self.ext = ".zst" if compression == "zstd" else ".gz"
+
+    def _object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:4], digest + ext)
+
+    def _index_path(self, event_id: str) -> str:
+        return os.path.join(self.root, "index", f"{event_id}.jsonl")
+
+    def put(self, content: bytes) -> str:
+        """
+        Store page content if not already present.
+
+        Returns:
+            SHA-256 hex digest identifying the snapshot
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        if self.find(digest):
+            return digest
+        compress, _ = CODECS[self.ext]
+        _atomic_write(self._object_path(digest, self.ext), compress(content))
+        return digest
+
+    def find(self, digest: str) -> str | None:
+        """Return the on-disk path of a snapshot, whichever codec it was written with."""
+        for ext in CODECS:
+            path = self._object_path(digest, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, digest: str) -> bytes:
+        """Return the decompressed content of a snapshot."""
+        path = self.find(digest)
+        if path is None:
+            raise KeyError(digest)
+        ext = os.path.splitext(path)[1]
+        if ext == ".zst" and zstandard is None:
+            raise RuntimeError(f"Snapshot {digest} is zstd-compressed but zstandard is not installed")
+        with open(path, "rb") as f:
+            return CODECS[ext][1](f.read())
+
+    def record(self, event_id: str, url: str, content: bytes, seen_at: str, **extra) -> str:
+        """
+        Store a fetched page and note in the event's index that it was seen.
+
+        Args:
+            event_id: race_event the page was fetched for
+            url: URL the page was fetched from
+            content: raw response body
+            seen_at: ISO 8601 fetch timestamp
+            **extra: additional fields to keep in the index entry (e.g. status)
+
+        Returns:
+            SHA-256 hex digest of the snapshot
+        """
+        digest = self.put(content)
+        entry = {"seen_at": seen_at, "sha256": digest, "url": url, "bytes": len(content), **extra}
+        path = self._index_path(event_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return digest
+
+    def history(self, event_id: str) -> list:
+        """Return the index entries for an event, oldest first."""
+        path = self._index_path(event_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def event_ids(self) -> list:
+        """Return every event_id that has at least one snapshot."""
+        index_dir = os.path.join(self.root, "index")
+        if not os.path.isdir(index_dir):
+            return []
+        return sorted(name[:-len(".jsonl")] for name in os.listdir(index_dir) if name.endswith(".jsonl"))
+
+
+def get_snapshot_store() -> SnapshotStore | None:
+    """
+    Return the configured snapshot store, or None when snapshots are disabled.
+
+    Enabled by RACERADAR_SNAPSHOT_DIR or config.snapshots.ENABLED.
+    """
+    root = os.environ.get("RACERADAR_SNAPSHOT_DIR")
+    if not root and not snapshot_config.ENABLED:
+        return None
+    return SnapshotStore(root or snapshot_config.ROOT)
@@ -0,0 +1,343 @@
+# scripts/storage.py
+"""
+Storage backends for RaceRadar scripts.
+
+Every script talks to the database through the same small PostgREST-shaped
+interface (select / insert / update driven by PostgREST query params), so the
+pipeline runs unchanged against Supabase in production or against a local
+SQLite file for offline runs, profiling and load tests.
+
+The backend is chosen by RACERADAR_BACKEND ("supabase" or "sqlite"), falling
+back to config.database.BACKEND.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import re
+import sqlite3
+import requests
+from config import database
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SQLITE_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "schema_sqlite.sql")
+
+# Query params that are not column filters
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict"}
+
+
+class StorageError(Exception):
+    """Raised when a backend rejects a request (mirrors a PostgREST error response)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}")
+        self.status = status
+        self.message = message
+
+
+class StorageBackend(ABC):
+    """
+    PostgREST-shaped storage interface.
+
+    `params` are PostgREST query params, e.g.
+    {"select": "event_id,reg_url", "reg_url": "not.is.null", "order": "observed_at.desc"}.
+    """
+
+    @abstractmethod
+    def select(self, table: str, params: dict | None = None) -> list:
+        """Return the rows of a table or view matching the filters in `params`."""
+
+    @abstractmethod
+    def insert(self, table: str, rows: list, on_conflict: str | None = None,
+               upsert: bool = False, returning: bool = True) -> list:
+        """Insert rows; with upsert=True merge duplicates on `on_conflict` (default: primary key)."""
+
+    @abstractmethod
+    def update(self, table: str, values: dict, params: dict, returning: bool = False) -> list:
+        """Apply `values` to every row matching the filters in `params`."""
+
+    @abstractmethod
+    def delete(self, table: str, params: dict) -> None:
+        """Delete every row matching the filters in `params`."""
+
+    def select_pages(self, table: str, params: dict | None = None, page_size: int = 1000):
+        """
+        Yield a large result in pages of at most `page_size` rows.
+
+        PostgREST caps rows per response, so big reads must page; `params`
+        should include an `order` on a unique column to keep pages stable.
+        """
+        offset = 0
+        while True:
+            page = self.select(table, {**(params or {}), "limit": page_size, "offset": offset})
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+
+class SupabaseBackend(StorageBackend):
+    """Supabase (PostgREST over HTTPS) backend."""
+
+    def __init__(self, url: str, key: str, timeout: int = database.DB_TIMEOUT):
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        })
+
+    def _request(self, method: str, table: str, params: dict | None = None,
+                 json_body=None, prefer: list | None = None) -> list:
+        headers = {"Prefer": ",".join(prefer)} if prefer else {}
+        r = self.session.request(
+            method, f"{self.base_url}/{table}", params=params or {}, json=json_body,
+            headers=headers, timeout=self.timeout
+        )
+        if r.status_code >= 300:
+            raise StorageError(r.status_code, r.text)
+        # Some responses are empty (201/204). Avoid json() crash.
+        if not (r.text or "").strip():
+            return []
+        try:
+            return r.json()
+        except ValueError:
+            logger.warning(f"Non-JSON response received: {r.status_code}, {(r.text or '')[:200]}")
+            return []
+
+    def select(self, table, params=None):
+        return self._request("GET", table, params=params)
+
+    def insert(self, table, rows, on_conflict=None, upsert=False, returning=True):
+        if not rows:
+            return []
+        prefer = ["return=representation" if returning else "return=minimal"]
+        if upsert:
+            prefer.append("resolution=merge-duplicates")
+        params = {"on_conflict": on_conflict} if on_conflict else {}
+        return self._request("POST", table, params=params, json_body=rows, prefer=prefer)
+
+    def update(self, table, values, params, returning=False):
+        prefer = ["return=representation" if returning else "return=minimal"]
+        return self._request("PATCH", table, params=params, json_body=values, prefer=prefer)
+
+    def delete(self, table, params):
+        self._request("DELETE", table, params=params, prefer=["return=minimal"])
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Local SQLite backend applying the schema.sql semantics (schema_sqlite.sql).
+
+    Supports the subset of PostgREST the scripts use: column selection,
+    eq/neq/gt/gte/lt/lte/like/ilike/in/is filters (optionally negated with
+    `not.`), order, limit/offset and upsert on a conflict target.
+    """
+
+    # Columns added to existing tables after their first release: (table, column, SQLite DDL).
+    # schema_sqlite.sql creates them for new databases; these bring older files up to date.
+    MIGRATIONS = [
+        ("status_observation", "first_seen", "TEXT"),
+        ("status_observation", "last_seen", "TEXT"),
+        ("status_observation", "count", "INTEGER NOT NULL DEFAULT 1"),
+        ("status_observation", "classifier_version", "TEXT"),
+        ("race_event", "reg_opens_at", "TEXT"),
+    ]
+
+    OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE"}
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # Shared across threads by long-running services; sqlite3 serialises access
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self._pk_cache = {}
+        self._migrate()
+        with open(SQLITE_SCHEMA_PATH, encoding="utf-8") as f:
+            self.conn.executescript(f.read())
+        logger.info(f"Using local SQLite backend at {path}")
+
+    def _migrate(self):
+        for table, column, ddl in self.MIGRATIONS:
+            info = self.conn.execute(f"PRAGMA table_info({self._ident(table)})").fetchall()
+            if info and column not in {r["name"] for r in info}:
+                logger.info(f"Migrating local database: adding {table}.{column}")
+                self.conn.execute(f"ALTER TABLE {self._ident(table)} ADD COLUMN {self._ident(column)} {ddl}")
+        self.conn.commit()
+
+    # ---- PostgREST param translation ----
+
+    @staticmethod
+    def _ident(name: str) -> str:
+        name = name.strip()
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+            raise StorageError(400, f"Invalid identifier: {name!r}")
+        return f'"{name}"'
+
+    def _columns(self, select: str | None) -> str:
+        if not select or select.strip() == "*":
+            return "*"
+        return ", ".join(self._ident(c) for c in select.split(","))
+
+    def _where(self, params: dict) -> tuple:
+        clauses, args = [], []
+        for col, expr in params.items():
+            if col in RESERVED_PARAMS:
+                continue
+            negate = expr.startswith("not.")
+            if negate:
+                expr = expr[4:]
+            op, _, value = expr.partition(".")
+            column = self._ident(col)
+            if op == "in":
+                items = [v.strip().strip('"') for v in value.strip("()").split(",") if v.strip()]
+                sql = f"{column} IN ({', '.join('?' * len(items))})" if items else "0"
+                args.extend(items)
+            elif op == "is":
+                literal = {"null": "NULL", "true": "1", "false": "0"}.get(value.lower())
+                if literal is None:
+                    raise StorageError(400, f"Unsupported is-filter: {value!r}")
+                sql = f"{column} IS {literal}"
+            elif op == "ilike":
+                sql = f"LOWER({column}) LIKE LOWER(?)"
+                args.append(value.replace("*", "%"))
+            elif op in self.OPERATORS:
+                sql = f"{column} {self.OPERATORS[op]} ?"
+                args.append(value.replace("*", "%") if op == "like" else value)
+            else:
+                raise StorageError(400, f"Unsupported filter operator: {op!r}")
+            clauses.append(f"NOT ({sql})" if negate else sql)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def _order(self, order: str | None) -> str:
+        if not order:
+            return ""
+        terms = []
+        for term in order.split(","):
+            parts = term.strip().split(".")
+            sql = self._ident(parts[0])
+            for modifier in parts[1:]:
+                sql += {"asc": " ASC", "desc": " DESC",
+                        "nullsfirst": " NULLS FIRST", "nullslast": " NULLS LAST"}.get(modifier, "")
+            terms.append(sql)
+        return " ORDER BY " + ", ".join(terms)
+
+    @staticmethod
+    def _value(v):
+        if isinstance(v, (dict, list)):
+            return json.dumps(v)
+        return v
+
+    def _primary_key(self, table: str) -> list:
+        if table not in self._pk_cache:
+            info = self.conn.execute(f"PRAGMA table_info({self._ident(table)})").fetchall()
+            self._pk_cache[table] = [r["name"] for r in sorted(info, key=lambda r: r["pk"]) if r["pk"]]
+        return self._pk_cache[table]
+
+    def _run(self, sql: str, args: list | tuple = ()) -> list:
+        try:
+            with self.conn:
+                return [dict(r) for r in self.conn.execute(sql, args).fetchall()]
+        except sqlite3.IntegrityError as e:
+            raise StorageError(409 if "UNIQUE" in str(e) else 400, str(e)) from e
+        except sqlite3.OperationalError as e:
+            raise StorageError(400, str(e)) from e
+
+    # ---- StorageBackend ----
+
+    def select(self, table, params=None):
+        params = params or {}
+        where, args = self._where(params)
+        sql = f"SELECT {self._columns(params.get('select'))} FROM {self._ident(table)}{where}"
+        sql += self._order(params.get("order"))
+        if "limit" in params:
+            sql += f" LIMIT {int(params['limit'])}"
+            if "offset" in params:
+                sql += f" OFFSET {int(params['offset'])}"
+        return self._run(sql, args)
+
+    def insert(self, table, rows, on_conflict=None, upsert=False, returning=True):
+        if not rows:
+            return []
+        target = [c.strip() for c in on_conflict.split(",")] if on_conflict else self._primary_key(table)
+        out = []
+        try:
+            with self.conn:
+                for row in rows:
+                    cols = list(row.keys())
+                    sql = (f"INSERT INTO {self._ident(table)} ({', '.join(self._ident(c) for c in cols)}) "
+                           f"VALUES ({', '.join('?' * len(cols))})")
+                    if upsert:
+                        updates = [c for c in cols if c not in target]
+                        conflict = ", ".join(self._ident(c) for c in target)
+                        if updates:
+                            sets = ", ".join(f"{self._ident(c)} = excluded.{self._ident(c)}" for c in updates)
+                            sql += f" ON CONFLICT ({conflict}) DO UPDATE SET {sets}"
+                        else:
+                            sql += f" ON CONFLICT ({conflict}) DO NOTHING"
+                    if returning:
+                        sql += " RETURNING *"
+                    cur = self.conn.execute(sql, [self._value(row[c]) for c in cols])
+                    if returning:
+                        out.extend(dict(r) for r in cur.fetchall())
+        except sqlite3.IntegrityError as e:
+            raise StorageError(409 if "UNIQUE" in str(e) else 400, str(e)) from e
+        except sqlite3.OperationalError as e:
+            raise StorageError(400, str(e)) from e
+        return out
+
+    def update(self, table, values, params, returning=False):
+        if not values:
+            return []
+        where, args = self._where(params)
+        sets = ", ".join(f"{self._ident(c)} = ?" for c in values)
+        sql = f"UPDATE {self._ident(table)} SET {sets}{where}"
+        if returning:
+            sql += " RETURNING *"
+        return self._run(sql, [self._value(v) for v in values.values()] + args)
+
+    def delete(self, table, params):
+        where, args = self._where(params)
+        self._run(f"DELETE FROM {self._ident(table)}{where}", args)
+
+
+_backend = None
+
+
+def get_backend() -> StorageBackend:
+    """
+    Return the configured storage backend (created once per process).
+
+    Returns:
+        SupabaseBackend or SqliteBackend, depending on RACERADAR_BACKEND
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    kind = os.environ.get("RACERADAR_BACKEND", database.BACKEND).strip().lower()
+    if kind == "sqlite":
+        _backend = SqliteBackend(os.environ.get("RACERADAR_SQLITE_PATH", database.SQLITE_PATH))
+    elif kind == "supabase":
+        try:
+            url = os.environ["SUPABASE_URL"]
+            key = os.environ["SUPABASE_SERVICE_KEY"]
+        except KeyError as e:
+            logger.error(f"Missing environment variable: {e}")
+            raise SystemExit(
+                f"Missing env var: {e}. Did you export SUPABASE_URL and SUPABASE_SERVICE_KEY? "
+                "(Or set RACERADAR_BACKEND=sqlite to run against a local database.)"
+            )
+        _backend = SupabaseBackend(url, key)
+        logger.info("Supabase configuration loaded")
+    else:
+        raise SystemExit(f"Unknown storage backend '{kind}'. Use 'supabase' or 'sqlite'.")
+    return _backend
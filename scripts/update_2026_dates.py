@@ -5,6 +5,8 @@ Based on official race calendars and typical race schedules
 """
 import csv
 from datetime import datetime
+from name_match import NameIndex
+from profiling import profiled_main
 
 # 2026 dates for major races (confirmed from official sources)
 DATE_UPDATES_2026 = {
@@ -172,6 +174,7 @@ def update_dates():
     output_file = "data/seed_races_updated.csv"
 
     rows_updated = 0
+    dates = NameIndex(DATE_UPDATES_2026)
     today = datetime(2025, 11, 2).date()
 
     with open(input_file, 'r', encoding='utf-8') as infile:
@@ -194,11 +197,13 @@ def update_dates():
 
                         if date_obj < today:
                             # Check if we have a 2026 date for this race
-                            if event in DATE_UPDATES_2026:
-                                row['Date'] = DATE_UPDATES_2026[event]
+                            match = dates.best(event)
+                            if match:
+                                row['Date'] = match.value
                                 rows_updated += 1
-                                print(f"✓ Updated: {event}")
-                                print(f"  {current_date} → {DATE_UPDATES_2026[event]}")
+                                via = "" if match.name == event else f" (matched '{match.name}', score {match.score})"
+                                print(f"✓ Updated: {event}{via}")
+                                print(f"  {current_date} → {match.value}")
                             else:
                                 print(f"⚠ No 2026 date found for: {event} (currently {current_date})")
                 except:
@@ -218,4 +223,4 @@ def update_dates():
     print(f"  mv {output_file} {input_file}")
 
 if __name__ == "__main__":
-    update_dates()
+    profiled_main(update_dates)
@@ -0,0 +1,232 @@
+# scripts/watch.py
+"""
+Watch daemon for races whose registration status is about to change.
+
+The nightly pipeline checks every race once a day, which is far too slow for
+races that sell out within minutes of opening. This daemon keeps a small hot
+set and polls it every few minutes:
+
+  - not_yet_open races whose expected opening (race_event.reg_opens_at) is
+    within the next OPENING_LOOKAHEAD_HOURS (or slipped by less than
+    OPENING_GRACE_HOURS), and
+  - volatile races, whose status moved between two known statuses
+    VOLATILE_CHANGES+ times in the last VOLATILE_DAYS (from the status_change
+    feed).
+
+Polling is minute-level during business hours in the race's own timezone
+(event_timezone) and hourly otherwise, except right around an expected
+opening. Each check goes through the usual observation and resolver path, so
+a status change reaches race_event and the change feed straight away.
+
+    python scripts/watch.py
+    python scripts/watch.py --once      # check the races that are due, then exit
+"""
+import argparse
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from check_availability import (
+    fetch_page, add_features, score_batch, record_pages, get_latest_observations, normalize_url, UA,
+)
+from config import watch as watch_config
+from crawl_policy import PolicyCache, HostScheduler
+from feature_classifier import load_model
+from logger import setup_logger
+from resolve_latest import resolve
+from roster import Event
+from snapshots import get_snapshot_store
+from storage import get_backend, StorageError
+from profiling import profiled_main
+
+logger = setup_logger(__name__)
+
+EVENT_COLUMNS = "event_id,series_id,year,reg_url,event_timezone,general_access_status,reg_opens_at"
+
+
+def zone_for(event: dict) -> ZoneInfo:
+    """The race's local timezone (DEFAULT_TIMEZONE when missing or unknown)."""
+    try:
+        return ZoneInfo(event.get("event_timezone") or watch_config.DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def expected_opening(event: dict) -> datetime | None:
+    """reg_opens_at as an aware datetime; a bare date means local midnight."""
+    value = event.get("reg_opens_at")
+    if not value:
+        return None
+    try:
+        opens = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return opens if opens.tzinfo else opens.replace(tzinfo=zone_for(event))
+
+
+def in_business_hours(event: dict, now: datetime) -> bool:
+    local = now.astimezone(zone_for(event))
+    return watch_config.BUSINESS_HOURS_START <= local.hour < watch_config.BUSINESS_HOURS_END
+
+
+def poll_interval(event: dict, now: datetime) -> timedelta:
+    """How long to wait before checking `event` again."""
+    opens = expected_opening(event)
+    imminent = opens and abs(opens - now) <= timedelta(minutes=watch_config.OPENING_IMMINENT_MINUTES)
+    if imminent or in_business_hours(event, now):
+        return timedelta(minutes=watch_config.POLL_MINUTES)
+    return timedelta(minutes=watch_config.OFF_HOURS_POLL_MINUTES)
+
+
+def is_transition(change: dict) -> bool:
+    """Whether a status_change row moves a race between two known statuses."""
+    return change.get("old_status") not in (None, "unknown") and change.get("new_status") not in (None, "unknown")
+
+
+def load_hot_set(now: datetime) -> list:
+    """
+    Races worth watching right now, soonest expected opening first.
+
+    Returns:
+        race_event rows (EVENT_COLUMNS), at most MAX_HOT_EVENTS
+    """
+    db = get_backend()
+    since = (now - timedelta(days=watch_config.VOLATILE_DAYS)).isoformat()
+    counts = Counter()
+    for page in db.select_pages("status_change", {
+            "select": "event_id,old_status,new_status", "changed_at": f"gte.{since}", "order": "change_id"}):
+        # Only transitions between two known statuses; a change from or to
+        # "unknown" is a page we couldn't read, not the race changing
+        counts.update(c["event_id"] for c in page if is_transition(c))
+    volatile = [eid for eid, n in counts.items() if n >= watch_config.VOLATILE_CHANGES]
+
+    hot = {}
+    window_start = now - timedelta(hours=watch_config.OPENING_GRACE_HOURS)
+    window_end = now + timedelta(hours=watch_config.OPENING_LOOKAHEAD_HOURS)
+    for page in db.select_pages("race_event", {
+        "select": EVENT_COLUMNS,
+        "general_access_status": "eq.not_yet_open",
+        "reg_opens_at": "not.is.null",
+        "reg_url": "not.is.null",
+        "order": "event_id",
+    }):
+        for ev in page:
+            opens = expected_opening(ev)
+            if opens and window_start <= opens <= window_end:
+                hot[ev["event_id"]] = ev
+    for i in range(0, len(volatile), 100):
+        for page in db.select_pages("race_event", {
+            "select": EVENT_COLUMNS,
+            "event_id": f"in.({','.join(volatile[i:i + 100])})",
+            "reg_url": "not.is.null",
+            "order": "event_id",
+        }):
+            for ev in page:
+                hot.setdefault(ev["event_id"], ev)
+
+    far = now + timedelta(days=3650)
+    ranked = sorted(hot.values(), key=lambda ev: abs((expected_opening(ev) or far) - now))
+    if len(ranked) > watch_config.MAX_HOT_EVENTS:
+        logger.warning(f"{len(ranked)} hot races; watching the {watch_config.MAX_HOT_EVENTS} closest to opening")
+    return ranked[:watch_config.MAX_HOT_EVENTS]
+
+
+class Watcher:
+    """Polls the hot set on per-race schedules and records results immediately."""
+
+    def __init__(self):
+        self.hot = {}          # event_id -> race_event row
+        self.next_due = {}     # event_id -> datetime of next check
+        self.refreshed_at = None
+        self.model = load_model()
+        self.store = get_snapshot_store()
+        self.policies = PolicyCache(headers=UA)
+
+    def refresh(self, now: datetime):
+        """Rebuild the hot set, keeping the schedule of races still in it."""
+        hot = {ev["event_id"]: ev for ev in load_hot_set(now)}
+        self.next_due = {eid: self.next_due.get(eid, now) for eid in hot}
+        self.hot = hot
+        self.refreshed_at = now
+        logger.info(f"Watching {len(hot)} hot races")
+
+    def due_groups(self, now: datetime) -> list:
+        """Due races grouped by registration page, so a shared page is fetched once."""
+        by_url = defaultdict(list)
+        for eid, due in self.next_due.items():
+            if due <= now:
+                ev = self.hot[eid]
+                by_url[normalize_url(ev["reg_url"])].append(ev)
+        return list(by_url.values())
+
+    def check(self, group: list, now: datetime) -> int:
+        """
+        Fetch one page, record it for every race behind it and resolve them.
+
+        Returns:
+            number of status changes recorded
+        """
+        for ev in group:
+            self.next_due[ev["event_id"]] = now + poll_interval(ev, now)
+        try:
+            page = fetch_page(group[0]["reg_url"], self.policies)
+        except Exception as e:
+            logger.warning(f"Failed to fetch {group[0].get('series_id')}/{group[0].get('year')}: {e}")
+            return 0
+        add_features(page, group[0].get("event_timezone"), self.model)
+        score_batch([page], self.model)
+        page["group"] = [Event.from_row(ev) for ev in group]
+        if not self.store:
+            page["content"] = None
+
+        event_ids = [ev["event_id"] for ev in group]
+        try:
+            record_pages([page], get_latest_observations(event_ids), self.store)
+            _, changed, _ = resolve(event_ids)
+        except StorageError as e:
+            logger.error(f"Failed to record check for {event_ids}: {e.status} {e.message}")
+            return 0
+        if changed:
+            logger.info(f"{group[0].get('series_id')}/{group[0].get('year')} is now {page['status']} "
+                        f"(confidence: {page['conf']:.2f})")
+        return changed
+
+    def run_once(self) -> int:
+        """Check every due race once. Returns the number of status changes."""
+        now = datetime.now(timezone.utc)
+        if not self.refreshed_at or now - self.refreshed_at >= timedelta(minutes=watch_config.HOT_SET_REFRESH_MINUTES):
+            self.refresh(now)
+        scheduler = HostScheduler(self.policies)
+        for group in self.due_groups(now):
+            scheduler.add(group[0]["reg_url"], group)
+        changed = sum(self.check(group, now) for _, group in scheduler)
+        self.policies.save()
+        return changed
+
+    def seconds_until_due(self) -> float:
+        if not self.next_due:
+            return watch_config.HOT_SET_REFRESH_MINUTES * 60
+        wait = (min(self.next_due.values()) - datetime.now(timezone.utc)).total_seconds()
+        return min(max(wait, 1.0), watch_config.HOT_SET_REFRESH_MINUTES * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll races about to change status at minute-level frequency.")
+    parser.add_argument("--once", action="store_true", help="check the races that are due, then exit")
+    args = parser.parse_args()
+
+    watcher = Watcher()
+    if args.once:
+        changed = watcher.run_once()
+        logger.info(f"✅ Checked due hot races: {changed} status changes")
+        return
+    try:
+        while True:
+            watcher.run_once()
+            time.sleep(watcher.seconds_until_due())
+    except KeyboardInterrupt:
+        logger.info("Watch daemon stopped")
+
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -0,0 +1,23 @@
+# tests/test_classify_regions.py
+from bs4 import BeautifulSoup
+from check_availability import classify_page
+
+
+def classify_html(html: str) -> tuple:
+    status, conf, _ = classify_page(BeautifulSoup(html, "html.parser"))
+    return status, conf
+
+
+def test_nav_register_link_does_not_override_sold_out_content():
+    html = "<nav><a>Register</a></nav><main><p>The 2026 race is now sold out.</p></main>"
+    assert classify_html(html) == ("sold_out", 0.95)
+
+
+def test_cta_boost_needs_agreeing_windows():
+    html = '<main><a class="btn">Register now</a><p>Entries are open, register today.</p></main>'
+    assert classify_html(html) == ("open", 0.85)
+
+
+def test_footer_text_is_not_a_fallback():
+    html = "<h1>Race 2026</h1><p>Info about the course.</p><footer>Register for our newsletter</footer>"
+    assert classify_html(html) == ("unknown", 0.40)